@@ -0,0 +1,231 @@
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2024 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+######################################################################################
+
+# **************************************
+# *  asyncio versions of the high      *
+# *  level functions.                  *
+# **************************************
+
+import asyncio
+import functools
+import os
+import re
+import weakref
+from . import hl
+from .vtk import VtkGroup
+
+def _stems(writer, path, args, kwargs):
+    # Paths without extension of the files that writer(path, *args, **kwargs) writes, and the
+    # directory that it creates for multiblock and AMR datasets (None for other writers)
+    stems, directory = [path], None
+    if writer in (hl.parallelImageToVTK, hl.parallelRectilinearToVTK, hl.parallelStructuredToVTK):
+        npieces = args[0] if args else kwargs["npieces"]
+        stems += ["%s_%d" % (path, i) for i in range(npieces)]
+    elif writer is hl.parallelUnstructuredGridToVTK:
+        pieces = args[0] if args else kwargs["pieces"]
+        stems += ["%s_%d" % (path, i) for i in range(len(pieces))]
+    elif writer is hl.multiBlockToVTK:
+        leaves = []
+        hl._collectBlocks(args[0] if args else kwargs["blocks"], "", leaves)
+        stems += [os.path.join(path, name) for b, name in leaves]
+        directory = path
+    elif writer is hl.amrToVTK:
+        levels = args[0] if args else kwargs["levels"]
+        stems += [os.path.join(path, "%d_%d" % (l, i)) for l, patches in enumerate(levels) for i in range(len(patches))]
+        directory = path
+    return stems, directory
+
+def _outputs(stems):
+    # Existing files named as one of stems followed by an extension, with their modification times
+    outputs = {}
+    for stem in stems:
+        root, base = os.path.split(os.path.abspath(stem))
+        pattern = re.compile(re.escape(base) + r"\.\w+$")
+        try:
+            names = os.listdir(root)
+        except FileNotFoundError:
+            continue
+        for n in names:
+            if pattern.match(n):
+                p = os.path.join(root, n)
+                try:
+                    outputs[p] = os.stat(p).st_mtime_ns
+                except OSError:
+                    pass
+    return outputs
+
+def _removeOutputs(stems, directory, before, existed):
+    # Removes files created or modified since outputs were listed in before, and the 
+    # directory of the dataset if it did not exist before and it is empty
+    for p, mtime in _outputs(stems).items():
+        if before.get(p) != mtime:
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+    if directory and not existed:
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
+
+async def _finish(future):
+    # Waits until a future of an executor is done, even if the waiting task is cancelled again
+    while not future.done():
+        try:
+            await asyncio.wait([future])
+        except asyncio.CancelledError:
+            pass
+    if not future.cancelled(): future.exception() # retrieved, so it is not logged
+
+class AsyncExporter:
+    """ Runs the functions of the hl module in an executor, so they can be awaited without 
+        blocking the event loop. The number of files written at the same time in each 
+        directory is limited. If a task is cancelled while its file is written, it waits
+        until the writer stops and removes the files it created or modified: path with 
+        any extension, the pieces of the parallel writers and the datasets of multiblock
+        and AMR files. Other writers must only write path.
+    """
+    def __init__(self, executor = None, maxPerDirectory = 4):
+        """
+            PARAMETERS:
+                executor: concurrent.futures executor that runs the writers. 
+                          By default, the default executor of the event loop.
+                maxPerDirectory: maximum number of files written at the same time in a directory.
+        """
+        self.executor = executor
+        self.maxPerDirectory = maxPerDirectory
+        self.semaphores = weakref.WeakKeyDictionary() # event loop -> {directory : asyncio.Semaphore}
+
+    def _semaphore(self, path):
+        loop = asyncio.get_running_loop()
+        semaphores = self.semaphores.setdefault(loop, {})
+        directory = os.path.dirname(os.path.abspath(path))
+        s = semaphores.get(directory)
+        if s is None:
+            s = semaphores[directory] = asyncio.Semaphore(self.maxPerDirectory)
+        return s
+
+    async def write(self, writer, path, *args, **kwargs):
+        """ Writes a file with writer, e.g. hl.imageToVTK, called as writer(path, *args, **kwargs).
+
+            RETURNS:
+                the value returned by writer, usually the full path to the file.
+        """
+        async with self._semaphore(path):
+            loop = asyncio.get_running_loop()
+            stems, directory = _stems(writer, path, args, kwargs)
+            before, existed = _outputs(stems), directory is not None and os.path.isdir(directory)
+            future = loop.run_in_executor(self.executor, functools.partial(writer, path, *args, **kwargs))
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The writer cannot be interrupted, so files are removed after it stops
+                await _finish(future)
+                _removeOutputs(stems, directory, before, existed)
+                raise
+
+_defaultExporter = None
+
+def defaultExporter():
+    """ Returns the AsyncExporter used by the functions of this module. """
+    global _defaultExporter
+    if _defaultExporter is None: _defaultExporter = AsyncExporter()
+    return _defaultExporter
+
+def _awaitable(function):
+    # Returns a coroutine function that runs function with the default exporter
+    async def wrapper(path, *args, **kwargs):
+        return await defaultExporter().write(function, path, *args, **kwargs)
+    wrapper.__name__ = wrapper.__qualname__ = function.__name__
+    wrapper.__doc__ = "Awaitable version of hl.%s, see AsyncExporter.write.\n%s" % (function.__name__, function.__doc__)
+    return wrapper
+
+imageToVTK = _awaitable(hl.imageToVTK)
+rectilinearToVTK = _awaitable(hl.rectilinearToVTK)
+structuredToVTK = _awaitable(hl.structuredToVTK)
+pointsToVTK = _awaitable(hl.pointsToVTK)
+pointsToVTKAsTIN = _awaitable(hl.pointsToVTKAsTIN)
+linesToVTK = _awaitable(hl.linesToVTK)
+polyLinesToVTK = _awaitable(hl.polyLinesToVTK)
+unstructuredGridToVTK = _awaitable(hl.unstructuredGridToVTK)
+unstructuredGridPiecesToVTK = _awaitable(hl.unstructuredGridPiecesToVTK)
+polyDataPiecesToVTK = _awaitable(hl.polyDataPiecesToVTK)
+staticGeometryToVTK = _awaitable(hl.staticGeometryToVTK)
+cylinderToVTK = _awaitable(hl.cylinderToVTK)
+parallelImageToVTK = _awaitable(hl.parallelImageToVTK)
+parallelRectilinearToVTK = _awaitable(hl.parallelRectilinearToVTK)
+parallelStructuredToVTK = _awaitable(hl.parallelStructuredToVTK)
+parallelUnstructuredGridToVTK = _awaitable(hl.parallelUnstructuredGridToVTK)
+multiBlockToVTK = _awaitable(hl.multiBlockToVTK)
+amrToVTK = _awaitable(hl.amrToVTK)
+
+class AsyncVtkGroup:
+    """ VtkGroup whose methods can be awaited. Calls are run one at a time in an executor. 
+        The VtkGroup is also opened in the executor, by open or by the first call, since
+        resuming a group reads its whole file.
+    """
+    def __init__(self, filepath, incremental = False, resume = False, executor = None):
+        """ See VtkGroup. executor is the executor that runs the calls, by default 
+            the default executor of the event loop.
+        """
+        self.filepath = filepath
+        self.incremental = incremental
+        self.resume = resume
+        self.group = None
+        self.executor = executor
+        self.lock = None
+
+    def _open(self):
+        if self.group is None:
+            self.group = VtkGroup(self.filepath, incremental = self.incremental, resume = self.resume)
+        return self.group
+
+    async def _run(self, function, *args):
+        # Runs function(group, *args) in the executor, after opening the group if needed
+        if self.lock is None: self.lock = asyncio.Lock()
+        async with self.lock:
+            call = lambda: function(self._open(), *args)
+            future = asyncio.get_running_loop().run_in_executor(self.executor, call)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The lock is held until the call stops, so calls never overlap
+                await _finish(future)
+                raise
+
+    async def open(self):
+        """ Opens the VtkGroup file, e.g. to index the entries of a resumed group before
+            the first call to addFile. Returns this AsyncVtkGroup.
+        """
+        await self._run(lambda group: None)
+        return self
+
+    async def addFile(self, filepath, sim_time, group = "", part = "0"):
+        """ See VtkGroup.addFile. """
+        await self._run(VtkGroup.addFile, filepath, sim_time, group, part)
+
+    async def save(self):
+        """ See VtkGroup.save. """
+        await self._run(VtkGroup.save)
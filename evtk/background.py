@@ -0,0 +1,159 @@
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2024 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+######################################################################################
+
+# **************************************
+# *  Background writer that exports    *
+# *  snapshots of the data while the   *
+# *  simulation continues.             *
+# **************************************
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import numpy as np
+except:
+    print("Numpy is not installed. Please install it before running EVTK again.")
+
+class AsyncWriter:
+    """ Writes files on a background thread with the functions of the hl module, so the
+        caller continues while data is encoded and written. Arrays are copied to buffers
+        that are reused by later snapshots, e.g. two sets of buffers with maxPending = 2 
+        (double buffering), or they are handed off to the writer without copies. 
+        When maxPending snapshots are waiting to be written, submit blocks until one of 
+        them is done (backpressure).
+
+        Example:
+            with AsyncWriter(maxPending = 2) as w:
+                for step in range(nsteps):
+                    ...
+                    w.submit(imageToVTK, "./out_%d" % step, cellData = {"pressure" : p})
+    """
+    def __init__(self, maxPending = 2, copy = True, nworkers = 1):
+        """
+            PARAMETERS:
+                maxPending: maximum number of snapshots that are being written or waiting to be written.
+                copy: if True, arrays are copied when they are submitted and the caller can modify 
+                      them immediately. If False, the writer takes ownership of the arrays, which must
+                      not be modified until the future returned by submit is done.
+                nworkers: number of threads that write files. Files are written in the order they are 
+                          submitted if it is 1.
+        """
+        assert (maxPending >= 1 and nworkers >= 1)
+        self.maxPending = maxPending
+        self.copy = copy
+        self.executor = ThreadPoolExecutor(nworkers)
+        self.slots = threading.BoundedSemaphore(maxPending)
+        self.buffers = {}  # (shape, dtype, order) -> list of free buffers
+        self.lock = threading.Lock()
+        self.futures = []
+
+    def _getBuffer(self, a):
+        # Copies array a to a free buffer, or a new one, with the same memory order 
+        order = "C" if a.flags.c_contiguous else "F"
+        key = (a.shape, a.dtype, order)
+        with self.lock:
+            free = self.buffers.get(key)
+            b = free.pop() if free else None
+        if b is None:
+            b = np.empty(a.shape, dtype = a.dtype, order = order)
+        np.copyto(b, a)
+        return b
+
+    def _releaseBuffers(self, buffers):
+        with self.lock:
+            for b in buffers:
+                key = (b.shape, b.dtype, "C" if b.flags.c_contiguous else "F")
+                free = self.buffers.setdefault(key, [])
+                if len(free) < self.maxPending: free.append(b)
+
+    def _snapshot(self, value, buffers):
+        # Copies arrays in value, which can be nested in tuples, lists and dictionaries
+        if isinstance(value, np.ndarray): # including subclasses, e.g. np.memmap
+            b = self._getBuffer(value)
+            buffers.append(b)
+            return b
+        elif isinstance(value, dict):
+            return {k : self._snapshot(v, buffers) for k, v in value.items()}
+        elif isinstance(value, tuple):
+            return tuple(self._snapshot(v, buffers) for v in value)
+        elif isinstance(value, list):
+            return [self._snapshot(v, buffers) for v in value]
+        return value
+
+    def submit(self, writer, path, *args, **kwargs):
+        """ Writes a file in background. It blocks while maxPending snapshots are pending.
+
+            PARAMETERS:
+                writer: function that writes the file, e.g. imageToVTK. 
+                        It is called as writer(path, *args, **kwargs).
+                path: name of the file without extension.
+                args, kwargs: arguments of writer.
+
+            RETURNS:
+                concurrent.futures.Future, whose result is the value returned by writer,
+                usually the full path to the file.
+        """
+        self.slots.acquire()
+        try:
+            buffers = []
+            if self.copy:
+                args = self._snapshot(args, buffers)
+                kwargs = self._snapshot(kwargs, buffers)
+            future = self.executor.submit(self._write, writer, path, args, kwargs, buffers)
+        except:
+            self.slots.release()
+            raise
+        # Failed writes are kept, so wait raises their errors
+        self.futures = [f for f in self.futures if not f.done() or f.exception() is not None]
+        self.futures.append(future)
+        return future
+
+    def _write(self, writer, path, args, kwargs, buffers):
+        try:
+            return writer(path, *args, **kwargs)
+        finally:
+            self._releaseBuffers(buffers)
+            self.slots.release()
+
+    def pending(self):
+        """ Returns the number of snapshots that have not been written yet. """
+        return sum(1 for f in self.futures if not f.done())
+
+    def wait(self):
+        """ Waits until all submitted files are written. Raises the first error found while writing. """
+        futures, self.futures = self.futures, []
+        for f in futures: f.result()
+
+    def close(self):
+        """ Waits until all submitted files are written and stops the background threads. """
+        try:
+            self.wait()
+        finally:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
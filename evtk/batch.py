@@ -0,0 +1,187 @@
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2024 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+######################################################################################
+
+# **************************************
+# *  Batch export of many files with   *
+# *  a pool of threads or processes.   *
+# **************************************
+
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from .evtk import ArraySource
+try:
+    import numpy as np
+except:
+    print("Numpy is not installed. Please install it before running EVTK again.")
+
+class NpyArray:
+    """ Array stored in a .npy or .npz file, which is only loaded by the job that writes it.
+        Its shape and type are read from the header of the file, without loading the data.
+        Arrays in .npy files are opened with a memory map.
+    """
+    def __init__(self, path, key = None):
+        """
+            PARAMETERS:
+                path: path to .npy or .npz file.
+                key: name of the array in a .npz file.
+        """
+        self.path = path
+        self.key = key
+        if key is None:
+            with open(path, "rb") as f:
+                self.shape, self.dtype = _read_npy_header(f)
+        else:
+            with zipfile.ZipFile(path) as z, z.open(key + ".npy") as f:
+                self.shape, self.dtype = _read_npy_header(f)
+        self.nbytes = int(np.prod(self.shape)) * self.dtype.itemsize
+
+    def load(self):
+        """ Returns the array, as a read-only memory map if possible. """
+        if self.key is None:
+            return np.load(self.path, mmap_mode = 'r')
+        with np.load(self.path) as z:
+            return z[self.key]
+
+def _read_npy_header(f):
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+    return shape, dtype
+
+def _nbytes(value):
+    # Size of the arrays in value, which can be nested in tuples, lists and dictionaries
+    if isinstance(value, (np.ndarray, NpyArray)):
+        return value.nbytes
+    elif isinstance(value, ArraySource):
+        return value.size * value.dtype.itemsize
+    elif isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    elif isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+def _load(value):
+    # Replaces NpyArray objects in value with their arrays
+    if isinstance(value, NpyArray):
+        return value.load()
+    elif isinstance(value, dict):
+        return {k : _load(v) for k, v in value.items()}
+    elif isinstance(value, tuple):
+        return tuple(_load(v) for v in value)
+    elif isinstance(value, list):
+        return [_load(v) for v in value]
+    return value
+
+class ExportJob:
+    """ File that is written by a batch, with one of the functions of the hl module. """
+    def __init__(self, writer, path, *args, **kwargs):
+        """
+            PARAMETERS:
+                writer: function that writes the file, e.g. rectilinearToVTK. It must be defined 
+                        at the top level of a module to use a pool of processes.
+                path: name of the file without extension.
+                args, kwargs: arguments of writer. Arrays can be NpyArray objects, which are loaded
+                              when the file is written.
+        """
+        self.writer = writer
+        self.path = path
+        self.args = args
+        self.kwargs = kwargs
+        self.nbytes = _nbytes(args) + _nbytes(kwargs) # estimated size of the file and memory used to write it
+
+    def run(self):
+        """ Writes the file. Returns the value returned by writer, usually the full path to the file. """
+        return self.writer(self.path, *_load(self.args), **_load(self.kwargs))
+
+def _runJob(job):
+    return job.run()
+
+class BatchReport:
+    """ Results of exportBatch. """
+    def __init__(self, paths, nbytes, seconds):
+        self.paths = paths       # values returned by the jobs, in the same order as the jobs
+        self.nbytes = nbytes     # size of the written files in bytes
+        self.seconds = seconds   # elapsed time
+
+    def throughput(self):
+        """ Returns the size of the written files per second, in MB/s. """
+        return self.nbytes / 1.0e6 / max(self.seconds, 1.0e-9)
+
+    def __str__(self):
+        return "%d files, %.1f MB in %.2f s (%.1f MB/s)" % (len(self.paths), self.nbytes / 1.0e6, self.seconds, self.throughput())
+
+def exportBatch(jobs, nworkers = None, processes = False, maxMemory = None, verbose = False):
+    """ Writes the files of a list of jobs with a pool of threads or processes.
+
+        PARAMETERS:
+            jobs: list of ExportJob.
+            nworkers: number of threads or processes. By default, the number of CPUs.
+            processes: if True, files are written by a pool of processes, otherwise by threads.
+                       Threads are enough when most time is spent compressing or writing, which 
+                       release the GIL. Jobs and their arguments are sent to processes with pickle,
+                       so large arrays should be given as NpyArray objects.
+            maxMemory: maximum estimated size in bytes of the jobs that run at the same time. 
+                       When the next job does not fit, a later job that fits is started instead.
+                       A job larger than maxMemory runs alone. None for no limit.
+            verbose: if True, prints the report.
+
+        RETURNS:
+            BatchReport, with the paths of the files in the same order as the jobs.
+    """
+    if nworkers is None: nworkers = os.cpu_count() or 1
+    start = time.perf_counter()
+    paths = [None] * len(jobs)
+    waiting = list(range(len(jobs)))
+    running = {}   # future -> index of job
+    memory = 0     # estimated size of running jobs
+    
+    Executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with Executor(nworkers) as executor:
+        try:
+            while waiting or running:
+                # starts jobs that fit, in order
+                for i in list(waiting):
+                    if len(running) >= nworkers: break
+                    size = jobs[i].nbytes
+                    if maxMemory is None or memory + size <= maxMemory or not running:
+                        running[executor.submit(_runJob, jobs[i])] = i
+                        memory += size
+                        waiting.remove(i)
+                done, _ = wait(running, return_when = FIRST_COMPLETED)
+                for f in done:
+                    i = running.pop(f)
+                    memory -= jobs[i].nbytes
+                    paths[i] = f.result() # raises any error found while writing
+        except:
+            for f in running: f.cancel()
+            raise
+    
+    nbytes = sum(os.path.getsize(p) for p in paths if isinstance(p, str) and os.path.isfile(p))
+    report = BatchReport(paths, nbytes, time.perf_counter() - start)
+    if verbose: print(report)
+    return report
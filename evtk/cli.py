@@ -0,0 +1,160 @@
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2024 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+######################################################################################
+
+# **************************************
+# *  Command line converter of .npy    *
+# *  and .npz files to VTK files.      *
+# **************************************
+
+# Only light modules are imported here, so the command starts quickly.
+# Numpy and the writers are imported when files are converted.
+import argparse
+import json
+import os
+import re
+import sys
+
+_USAGE_EXAMPLE = """
+Example of configuration file (JSON, or TOML with the same keys):
+    {
+      "grid" : "image",
+      "origin" : [0.0, 0.0, 0.0],
+      "spacing" : [0.1, 0.1, 0.1],
+      "cellData" : { "pressure" : "p" },
+      "pointData" : { "velocity" : ["u", "v", "w"] },
+      "compressor" : true
+    }
+
+grid is "image", "rectilinear" or "structured". Rectilinear and structured grids need 
+"coordinates" : ["x", "y", "z"]. Arrays are named by their key in each .npz snapshot, 
+"array" for the array of a .npy snapshot, or "file.npz:key" and "file.npy" for arrays 
+that are the same for all snapshots (paths relative to the configuration file).
+A list of 3 arrays is a vector. The time of a snapshot is the first number in its name,
+or its position when its name has no number.
+"""
+
+_GRIDS = ("image", "rectilinear", "structured")
+
+def _readConfig(path):
+    if path.endswith(".toml"):
+        import tomllib # Python >= 3.11
+        with open(path, "rb") as f:
+            config = tomllib.load(f)
+    else:
+        with open(path) as f:
+            config = json.load(f)
+    assert (config.get("grid") in _GRIDS), "grid must be one of " + ", ".join(_GRIDS)
+    if config["grid"] != "image":
+        assert (len(config.get("coordinates", ())) == 3), "coordinates must name the arrays x, y, z"
+    assert (config.get("cellData") or config.get("pointData")), "cellData or pointData is required"
+    return config
+
+def _snapshots(inputs):
+    # Lists the .npy and .npz files given as inputs, or stored in directories given as inputs
+    files = []
+    for i in inputs:
+        if os.path.isdir(i):
+            files.extend(os.path.join(i, n) for n in sorted(os.listdir(i)) if n.endswith((".npy", ".npz")))
+        else:
+            files.append(i)
+    return files
+
+def _snapshotTime(path, index):
+    # A sign is only part of the number at the start of the name or after a separator other 
+    # than - or +, e.g. snap-001 is 1 and t_-0.5 is -0.5
+    m = re.search(r"(?:(?<![0-9A-Za-z+-])[-+])?\d+(\.\d*)?([eE][-+]?\d+)?", os.path.splitext(os.path.basename(path))[0])
+    return float(m.group(0)) if m else float(index)
+
+def _array(ref, snapshot, root):
+    # Returns the NpyArray named by ref, see _USAGE_EXAMPLE
+    from .batch import NpyArray
+    if isinstance(ref, (list, tuple)):
+        assert (len(ref) == 3), "Vectors must have 3 components: " + str(ref)
+        return tuple(_array(r, snapshot, root) for r in ref)
+    path, sep, key = ref.rpartition(":")
+    if sep and path.endswith(".npz"):
+        return NpyArray(os.path.join(root, path), key)
+    if ref.endswith(".npy"):
+        return NpyArray(os.path.join(root, ref))
+    if snapshot.endswith(".npy"):
+        assert (ref == "array"), "The array of a .npy snapshot is named array: " + ref
+        return NpyArray(snapshot)
+    return NpyArray(snapshot, ref)
+
+def _job(config, root, snapshot, path):
+    from . import hl
+    from .batch import ExportJob
+    data = lambda name: {k : _array(r, snapshot, root) for k, r in config[name].items()} if config.get(name) else None
+    cellData, pointData = data("cellData"), data("pointData")
+    compressor = config.get("compressor")
+    if config["grid"] == "image":
+        return ExportJob(hl.imageToVTK, path, origin = tuple(config.get("origin", (0.0, 0.0, 0.0))), 
+                         spacing = tuple(config.get("spacing", (1.0, 1.0, 1.0))), cellData = cellData, 
+                         pointData = pointData, compressor = compressor)
+    x, y, z = _array(config["coordinates"], snapshot, root)
+    writer = hl.rectilinearToVTK if config["grid"] == "rectilinear" else hl.structuredToVTK
+    return ExportJob(writer, path, x, y, z, cellData = cellData, pointData = pointData, compressor = compressor)
+
+def main(argv = None):
+    """ Entry point of the evtk-convert command. Returns the exit status. """
+    parser = argparse.ArgumentParser(prog = "evtk-convert",
+                                     description = "Converts .npy/.npz snapshots to VTK files and a .pvd collection.",
+                                     epilog = _USAGE_EXAMPLE, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("config", help = "JSON or TOML file that maps arrays to the grid and its fields")
+    parser.add_argument("inputs", nargs = "+", help = ".npy/.npz files or directories that contain them")
+    parser.add_argument("-o", "--output", default = ".", help = "output directory (default: current directory)")
+    parser.add_argument("-g", "--group", default = "series", help = "name of the .pvd file, without extension (default: series)")
+    parser.add_argument("-j", "--workers", type = int, default = None, help = "number of processes (default: number of CPUs)")
+    parser.add_argument("-m", "--max-memory", type = float, default = None, help = "maximum MB of snapshots converted at the same time")
+    parser.add_argument("-q", "--quiet", action = "store_true", help = "do not print a report")
+    args = parser.parse_args(argv)
+
+    try:
+        config = _readConfig(args.config)
+        snapshots = _snapshots(args.inputs)
+        assert (snapshots), "No .npy or .npz files found."
+        times = [_snapshotTime(s, i) for i, s in enumerate(snapshots)]
+        order = sorted(range(len(snapshots)), key = lambda i: (times[i], snapshots[i]))
+        root = os.path.dirname(os.path.abspath(args.config))
+        os.makedirs(args.output, exist_ok = True)
+        names = [os.path.splitext(os.path.basename(snapshots[i]))[0] for i in order]
+        assert (len(set(names)) == len(names)), "Snapshots must have different names."
+        jobs = [_job(config, root, snapshots[i], os.path.join(args.output, n)) for i, n in zip(order, names)]
+    except (AssertionError, OSError, ValueError, KeyError) as e:
+        print("evtk-convert: error: %s" % e, file = sys.stderr)
+        return 2
+
+    from .batch import exportBatch
+    from .vtk import VtkGroup
+    maxMemory = args.max_memory * 1.0e6 if args.max_memory else None
+    report = exportBatch(jobs, nworkers = args.workers, processes = True, maxMemory = maxMemory)
+    group = VtkGroup(os.path.join(args.output, args.group))
+    for i, path in zip(order, report.paths):
+        group.addFile(path, times[i])
+    group.save()
+    if not args.quiet: print(report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
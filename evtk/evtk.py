@@ -22,8 +22,15 @@
 # SOFTWARE.
 ######################################################################################
 
+import hashlib
+import io
+import os
 import struct
 import sys
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 try:
     import numpy as np
 except:
@@ -41,6 +48,13 @@ np_to_struct = { 'int8'    : 'b',
                  'float32' : 'f',
                  'float64' : 'd' }
               
+# Same types as np_to_struct, as (kind, itemsize), which is faster to check than dtype.name
+_supported_types = { ('i', 1), ('u', 1), ('i', 2), ('u', 2), ('i', 4), ('u', 4),
+                     ('i', 8), ('u', 8), ('f', 4), ('f', 8) }
+
+def _check_type(dtype):
+    assert ((dtype.kind, dtype.itemsize) in _supported_types), "Unsupported data type: " + dtype.name
+
 def _get_byte_order_char():
 # Check format in https://docs.python.org/3.5/library/struct.html
     if sys.byteorder == "little":
@@ -55,49 +69,693 @@ def writeBlockSize(stream, block_size):
     fmt = _get_byte_order_char() + 'Q' # Write size as unsigned long long == 64 bits unsigned integer
     stream.write(struct.pack(fmt, block_size))
 
-def writeArrayToFile(stream, data):
+# Default size in bytes of the scratch buffers used to reorder or interleave arrays
+WRITE_BUFFER_SIZE = 8 * 1024 * 1024
+
+def _fortran_view(data):
+    # Returns a flat view of data in Fortran order, or None if that requires a copy,
+    # i.e. when data is a multidimensional array with C-layout.
+    if data.ndim == 1 or data.flags['F_CONTIGUOUS']:
+        return np.ravel(data, order='F')
+    return None
+
+def _fortran_blocks(shape, nmax):
+    # Splits a 3D index space in blocks that, written one after the other, traverse 
+    # it in Fortran order. Each block has at most nmax elements, i.e. several whole 
+    # k-planes, or some j-rows of a single plane if a plane is larger than nmax 
+    # (a single row is never split).
+    nx, ny, nz = shape
+    plane = nx * ny
+    if plane <= nmax:
+        dk = max(1, nmax // max(1, plane))
+        for k in range(0, nz, dk):
+            yield slice(0, ny), slice(k, min(k + dk, nz))
+    else:
+        dj = max(1, nmax // nx)
+        for k in range(nz):
+            for j in range(0, ny, dj):
+                yield slice(j, min(j + dj, ny)), slice(k, k + 1)
+
+def writeArrayToFile(stream, data, buffer_size = None):
+    """ Writes array to stream in Fortran order, as expected by VTK.
+        
+        PARAMETERS:
+            stream: binary stream.
+            data: one or three-dimensional array, or an ArraySource.
+            buffer_size: maximum size in bytes of the scratch buffer used to reorder
+                         3D arrays with C-layout. Default is WRITE_BUFFER_SIZE.
+    """
     #stream.flush() # this should not be necessary          
     assert (data.ndim == 1 or data.ndim == 3)
-    fmt = _get_byte_order_char() + str(data.size) + np_to_struct[data.dtype.name]  # > for big endian
+    _check_type(data.dtype)
+
+    if isinstance(data, ArraySource):
+        for c in data.chunks():
+            _writeFortran(stream, c, buffer_size)
+        return
 
     # Check if array is contiguous
     assert (data.flags['C_CONTIGUOUS'] or data.flags['F_CONTIGUOUS'])
-    
+    _writeFortran(stream, data, buffer_size)
+
+def _writeFortran(stream, data, buffer_size):
     # NOTE: VTK expects data in FORTRAN order
-    # This is only needed when a multidimensional array has C-layout
-    dd = np.ravel(data, order='F')
+    # Memory of the array is written through the buffer protocol, i.e. without 
+    # creating a Python object for each element. 1D and Fortran arrays are written 
+    # without any copy.
+    if buffer_size is None: buffer_size = WRITE_BUFFER_SIZE
+    if data.ndim != 1 and data.ndim != 3: data = np.ravel(data, order='F')
+    dd = _fortran_view(data)
+    if dd is None and data.nbytes <= buffer_size: 
+        dd = np.ravel(data, order='F') # small arrays are reordered with a single copy
+    if dd is not None and dd.dtype.isnative:
+        stream.write(memoryview(dd).cast('B'))
+        return
 
-    bin = struct.pack(fmt, *dd)
-    stream.write(bin)
+    # Otherwise, data is reordered (3D arrays with C-layout) or swapped to native 
+    # byte order (as struct.pack did before) in blocks that fit in a reusable buffer.
+    nmax = max(1, min(data.size, buffer_size // data.dtype.itemsize))
+    if dd is None: nmax = max(nmax, data.shape[0]) # rows are never split
+    buff = np.empty(nmax, dtype = data.dtype.newbyteorder('='))
+    
+    if dd is not None:
+        for start in range(0, dd.size, nmax):
+            end = min(start + nmax, dd.size)
+            b = buff[:end - start]
+            b[:] = dd[start:end]
+            stream.write(memoryview(b).cast('B'))
+    else:
+        for js, ks in _fortran_blocks(data.shape, nmax):
+            block = data[:, js, ks]
+            b = buff[:block.size]
+            b.reshape(block.shape[::-1])[...] = block.T
+            stream.write(memoryview(b).cast('B'))
     
 # ==============================================================================
-def writeArraysToFile(stream, x, y, z):
+class PositionalWriter:
+    """ Stream that writes to a file descriptor from a given position with os.pwrite,
+        without changing the position of the file. Several threads can write at 
+        different positions of the same file at the same time.
+    """
+    def __init__(self, fd, position):
+        self.fd = fd
+        self.position = position
+
+    def write(self, b):
+        b = memoryview(b).cast('B')
+        while len(b) > 0:
+            n = os.pwrite(self.fd, b, self.position)
+            self.position += n
+            b = b[n:]
+
+# ==============================================================================
+def writeArraysToFile(stream, x, y, z, buffer_size = None):
+    """ Writes three arrays as the interleaved components of a vector field,
+        i.e. x0 y0 z0 x1 y1 z1 ...
+
+        PARAMETERS:
+            stream: binary stream.
+            x, y, z: arrays with the components of the field.
+            buffer_size: maximum size in bytes of the scratch buffer used to interleave the
+                         components. Default is WRITE_BUFFER_SIZE.
+    """
     # Check if arrays have same shape and data type
     assert ( x.size == y.size == z.size ), "Different array sizes."
     assert ( x.dtype.itemsize == y.dtype.itemsize == z.dtype.itemsize ), "Different item sizes."
+    _check_type(x.dtype)
   
     nitems = x.size
     itemsize = x.dtype.itemsize
-
-    fmt = _get_byte_order_char() + str(1) + np_to_struct[x.dtype.name]  # > for big endian
+    if buffer_size is None: buffer_size = WRITE_BUFFER_SIZE
+    
+    if any(isinstance(c, ArraySource) for c in (x, y, z)):
+        _writeSourcesToFile(stream, x, y, z, buffer_size)
+        return
     
     # Check if arrays are contiguous
     assert (x.flags['C_CONTIGUOUS'] or x.flags['F_CONTIGUOUS'])
     assert (y.flags['C_CONTIGUOUS'] or y.flags['F_CONTIGUOUS'])
     assert (z.flags['C_CONTIGUOUS'] or z.flags['F_CONTIGUOUS'])
     
-    
     # NOTE: VTK expects data in FORTRAN order
-    # This is only needed when a multidimensional array has C-layout
-    xx = np.ravel(x, order='F')
-    yy = np.ravel(y, order='F')
-    zz = np.ravel(z, order='F')    
+    views = [_fortran_view(c) for c in (x, y, z)]
+    shapes = [c.shape for c, v in zip((x, y, z), views) if v is None]
+
+    # Components are copied to a fixed size buffer, which is reused for all chunks.
+    # All components are written with the type of x, as the previous element-wise writer did.
+    chunk = max(1, min(nitems, buffer_size // (3 * itemsize)))
+    if shapes: chunk = max(chunk, shapes[0][0]) # rows are never split
+    buff = np.empty( (chunk, 3), dtype = x.dtype.newbyteorder('=') )
+    
+    if not shapes:
+        xx, yy, zz = views
+        for start in range(0, nitems, chunk):
+            end = min(start + chunk, nitems)
+            b = buff[:end - start]
+            b[:, 0] = xx[start:end]
+            b[:, 1] = yy[start:end]
+            b[:, 2] = zz[start:end]
+            stream.write(memoryview(b).cast('B'))
+    else:
+        # At least one component is a 3D array with C-layout, so all components are 
+        # read in blocks of its shape (1D and Fortran arrays are reshaped without copies).
+        shape = shapes[0]
+        comps = [np.reshape(c, shape, order='F') for c in (x, y, z)]
+        for js, ks in _fortran_blocks(shape, chunk):
+            n = shape[0] * (js.stop - js.start) * (ks.stop - ks.start)
+            b = buff[:n]
+            bb = b.reshape( (ks.stop - ks.start, js.stop - js.start, shape[0], 3) )
+            for i, c in enumerate(comps):
+                bb[..., i] = c[:, js, ks].T
+            stream.write(memoryview(b).cast('B'))
+
+def _writeSourcesToFile(stream, x, y, z, buffer_size):
+    # Same as writeArraysToFile, but components are read chunk by chunk. Chunks of
+    # different components do not need to have the same size.
+    readers = [_ElementReader(c if isinstance(c, ArraySource) else MemmapSource(c)) for c in (x, y, z)]
+    nitems = x.size
+    chunk = max(1, min(nitems, buffer_size // (3 * x.dtype.itemsize)))
+    buff = np.empty( (chunk, 3), dtype = x.dtype.newbyteorder('=') )
+    for start in range(0, nitems, chunk):
+        end = min(start + chunk, nitems)
+        b = buff[:end - start]
+        for i, r in enumerate(readers):
+            r.read(b[:, i])
+        stream.write(memoryview(b).cast('B'))
+
+class _ElementReader:
+    # Reads consecutive elements (in Fortran order) from the chunks of a source.
+    def __init__(self, source):
+        self.chunks = source.chunks()
+        self.current = None
+        self.pos = 0
+    
+    def read(self, out):
+        filled = 0
+        while filled < out.size:
+            if self.current is None or self.pos == self.current.size:
+                self.current = np.ravel(next(self.chunks), order='F')
+                self.pos = 0
+            n = min(out.size - filled, self.current.size - self.pos)
+            out[filled:filled + n] = self.current[self.pos:self.pos + n]
+            filled += n
+            self.pos += n
+
+# ================================
+#          Array sources
+# ================================
+class ArraySource:
+    """ Base class of arrays that are written chunk by chunk, e.g. fields that 
+        do not fit in memory. It can be used instead of a numpy array in VtkFile.addData,
+        VtkFile.appendData and all high level functions.
         
-    # eliminate this loop by creating a composed array.
-    for i in range(nitems):
-        bx = struct.pack(fmt, xx[i])
-        by = struct.pack(fmt, yy[i])
-        bz = struct.pack(fmt, zz[i])
-        stream.write(bx)
-        stream.write(by)
-        stream.write(bz)
+        Derived classes must implement chunks().
+    """
+    def __init__(self, shape, dtype):
+        """
+            PARAMETERS:
+                shape: shape of the complete array. It should be one or three-dimensional.
+                dtype: numpy data type of the array.
+        """
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.ndim = len(self.shape)
+        self.size = int(np.prod(self.shape))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def chunks(self):
+        """ Returns an iterator over the chunks of the array. Chunks are numpy arrays
+            with the data type of this source. Their elements, taken in Fortran order 
+            one chunk after the other, must be the elements of the array in Fortran order.
+            For example, 3D chunks can be slabs of the array along the last axis.
+        """
+        raise NotImplementedError
+
+class MemmapSource(ArraySource):
+    """ Reads a numpy array, usually a numpy.memmap, in chunks of limited size. 
+        Only the chunk being written has to be loaded into memory.
+    """
+    def __init__(self, array, buffer_size = None):
+        """
+            PARAMETERS:
+                array: one or three-dimensional numpy array or numpy.memmap.
+                buffer_size: approximate size in bytes of each chunk. Default is WRITE_BUFFER_SIZE.
+        """
+        ArraySource.__init__(self, array.shape, array.dtype)
+        self.array = array
+        self.buffer_size = buffer_size if buffer_size else WRITE_BUFFER_SIZE
+
+    def chunks(self):
+        nmax = max(1, self.buffer_size // self.dtype.itemsize)
+        flat = _fortran_view(self.array)
+        if flat is not None:
+            for start in range(0, flat.size, nmax):
+                yield flat[start:start + nmax]
+        else:
+            for js, ks in _fortran_blocks(self.shape, nmax):
+                yield self.array[:, js, ks]
+
+class NpyFileSource(MemmapSource):
+    """ Reads an array stored in a .npy file, which is opened with a memory map. """
+    def __init__(self, path, buffer_size = None):
+        """
+            PARAMETERS:
+                path: path to .npy file.
+                buffer_size: approximate size in bytes of each chunk. Default is WRITE_BUFFER_SIZE.
+        """
+        MemmapSource.__init__(self, np.load(path, mmap_mode = 'r'), buffer_size)
+        self.path = path
+
+class GeneratorSource(ArraySource):
+    """ Array whose chunks are produced by a Python generator or any iterable. """
+    def __init__(self, blocks, shape, dtype):
+        """
+            PARAMETERS:
+                blocks: iterable of numpy arrays, or function without arguments that returns one.
+                        A function should be given if the array has to be read more than once.
+                        See ArraySource.chunks for the order of the elements.
+                shape: shape of the complete array.
+                dtype: data type of the array. Blocks are converted to it if needed.
+        """
+        ArraySource.__init__(self, shape, dtype)
+        self.blocks = blocks
+
+    def chunks(self):
+        blocks = self.blocks() if callable(self.blocks) else self.blocks
+        nitems = 0
+        for b in blocks:
+            b = np.asarray(b, dtype = self.dtype)
+            nitems += b.size
+            assert (nitems <= self.size), "Blocks have more elements than the array."
+            yield b
+        assert (nitems == self.size), "Blocks have less elements than the array."
+
+def _isArray(data):
+    return isinstance(data, (np.ndarray, ArraySource))
+
+# ================================
+#           Compression
+# ================================
+class ZlibCompressor:
+    """ Compresses appended data with zlib, in the block format of vtkZLibDataCompressor. """
+    name = "vtkZLibDataCompressor"
+
+    def __init__(self, level = 6, blockSize = 32768, nthreads = 1, maxPending = None):
+        """
+            PARAMETERS:
+                level: zlib compression level, from 0 (no compression) to 9 (best compression).
+                blockSize: size in bytes of the uncompressed blocks (32768 is the default in VTK).
+                nthreads: number of threads used to compress blocks of the same array in parallel.
+                maxPending: maximum number of blocks that are being compressed at the same time,
+                            which limits the memory used by the threads. Default is 4 * nthreads.
+        """
+        assert (-1 <= level <= 9), "Compression level must be between -1 and 9."
+        assert (blockSize > 0)
+        assert (nthreads >= 1)
+        self.level = level
+        self.blockSize = blockSize
+        self.nthreads = nthreads
+        self.maxPending = maxPending if maxPending else 4 * nthreads
+        self._executor = None
+        self._pid = None     # process that created the pool
+
+    def compress(self, block, level = None):
+        return zlib.compress(block, self.level if level is None else level)
+
+    def selectLevel(self, name, data):
+        """ Returns the compression level used for the data array with the given name. """
+        return self.level
+
+    def getExecutor(self):
+        """ Returns the pool of threads used to compress blocks, or None if nthreads is 1.
+            zlib releases the GIL, so blocks are really compressed in parallel.
+            The pool is created the first time it is needed and reused by all files 
+            written with this compressor.
+            A forked process inherits the pool but not its threads, so it creates its own pool.
+        """
+        if self._pid != os.getpid():
+            self._executor = None
+        if self.nthreads > 1 and self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers = self.nthreads)
+            self._pid = os.getpid()
+        return self._executor
+
+    def __getstate__(self):
+        # The pool of threads is not copied to other processes
+        state = self.__dict__.copy()
+        state["_executor"], state["_pid"] = None, None
+        return state
+
+    def close(self):
+        """ Stops the threads of this compressor, if any. """
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown()
+            self._executor = None
+
+class CompressionDecision:
+    """ Compression level selected by AutoCompressor for a data array. """
+    def __init__(self, name, level, ratio, speed):
+        self.name = name
+        self.level = level   # 0 means that data is stored without compression
+        self.ratio = ratio   # estimated compression ratio, None if it was not estimated
+        self.speed = speed   # estimated compression speed in MB/s, None if it was not estimated
+
+    def __str__(self):
+        if self.ratio is None:
+            return "Array: %s  Level: %d (not sampled)" % (self.name, self.level)
+        return "Array: %s  Level: %d  Ratio: %.2f  Speed: %.1f MB/s" % (self.name, self.level, self.ratio, self.speed)
+
+class AutoCompressor(ZlibCompressor):
+    """ Selects a zlib compression level for each data array, after compressing a few
+        blocks sampled from it. The selected level is the one that gives the smallest 
+        file while compressing faster than minSpeed, or 0 (data stored without compression,
+        i.e. raw) if no level reaches minRatio within that budget.
+        
+        The compressor attribute of a VTK file applies to all its arrays, so arrays that
+        are not worth compressing are stored in zlib blocks of level 0, which only adds
+        a few bytes per block.
+    """
+    def __init__(self, levels = (1, 6, 9), minRatio = 1.1, minSpeed = 20.0, sampleBlocks = 4,
+                 defaultLevel = 6, blockSize = 32768, nthreads = 1, maxPending = None, verbose = False):
+        """
+            PARAMETERS:
+                levels: compression levels that are tried.
+                minRatio: minimum compression ratio (uncompressed size / compressed size)
+                          that makes worth compressing an array.
+                minSpeed: CPU budget given as the minimum compression speed in MB/s 
+                          (of uncompressed data per thread) accepted for any level.
+                sampleBlocks: number of blocks, evenly spaced along the array, that are compressed
+                              to estimate compression ratio and speed.
+                defaultLevel: level used for sources that cannot be sampled, e.g. GeneratorSource.
+                verbose: if True, print each decision.
+                
+                See ZlibCompressor for other parameters.
+        """
+        ZlibCompressor.__init__(self, level = defaultLevel, blockSize = blockSize, nthreads = nthreads, maxPending = maxPending)
+        self.levels = sorted(levels)
+        self.minRatio = minRatio
+        self.minSpeed = minSpeed
+        self.sampleBlocks = sampleBlocks
+        self.verbose = verbose
+        self.decisions = []  # list of CompressionDecision, one for each array written
+
+    def selectLevel(self, name, data):
+        sample = self._sample(data)
+        if sample is None:
+            # Sources that are not arrays can only be read once
+            d = CompressionDecision(name, self.level, None, None)
+        else:
+            nbytes = sum(len(b) for b in sample)
+            d = CompressionDecision(name, 0, 1.0, float("inf"))
+            best = nbytes
+            for level in self.levels:
+                start = time.perf_counter()
+                csize = sum(len(self.compress(b, level)) for b in sample)
+                elapsed = time.perf_counter() - start
+                speed = nbytes / 1.0e6 / max(elapsed, 1.0e-9)
+                # A higher level must reduce the size at least 5% more to be worth its cost
+                if speed >= self.minSpeed and nbytes >= self.minRatio * csize and csize < 0.95 * best:
+                    d = CompressionDecision(name, level, nbytes / csize, speed)
+                    best = csize
+        self.decisions.append(d)
+        if self.verbose: print(d)
+        return d.level
+
+    def _sample(self, data):
+        # Returns a list of blocks of bytes taken from data, in the order in which data is written
+        comps = data if isinstance(data, tuple) else (data,)
+        flats = []
+        for c in comps:
+            if isinstance(c, MemmapSource): c = c.array
+            if not isinstance(c, np.ndarray): return None
+            # Memory order is good enough to estimate compression of C arrays
+            flats.append(np.ravel(c, order='K'))
+        
+        nitems = flats[0].size
+        m = max(1, self.blockSize // (len(flats) * flats[0].dtype.itemsize))  # elements per block
+        nblocks = min(self.sampleBlocks, (nitems + m - 1) // m)
+        starts = np.linspace(0, max(0, nitems - m), nblocks).astype(int) if nblocks > 0 else []
+        return [np.column_stack([f[i:i + m] for f in flats]).tobytes() for i in starts]
+
+def _toCompressor(compressor):
+    # Converts the compressor argument of VtkFile and the high level functions
+    if compressor is None or compressor is False:
+        return None
+    elif compressor is True:
+        return ZlibCompressor()
+    elif compressor == "auto":
+        return AutoCompressor()
+    elif isinstance(compressor, int):
+        return ZlibCompressor(level = compressor)
+    else:
+        return compressor
+
+class CompressedBlockWriter:
+    """ Stream that compresses all bytes written to it and writes them as a single 
+        compressed data array to the underlying stream, which must be seekable.
+
+        The data array has a header with the number of blocks, the size of the 
+        uncompressed blocks, the size of the last partial block (0 if it is complete)
+        and the size of each compressed block, all of them as UInt64. The header is 
+        written when the writer is closed, after the size of each block is known.
+    """
+    def __init__(self, stream, compressor, nbytes, level = None):
+        """
+            PARAMETERS:
+                stream: binary stream.
+                compressor: compressor object, e.g. ZlibCompressor.
+                nbytes: number of uncompressed bytes that will be written.
+                level: compression level. Default is the level of the compressor.
+        """
+        self.stream = stream
+        self.compressor = compressor
+        self.nbytes = nbytes
+        self.level = level
+        bs = compressor.blockSize
+        self.nblocks = (nbytes + bs - 1) // bs
+        self.sizes = []
+        self.pending = bytearray()
+        self.executor = compressor.getExecutor() if self.nblocks > 1 else None
+        self.compressing = deque()  # blocks submitted to the executor, in file order
+        self.headerPosition = stream.tell()
+        stream.write(bytes(8 * (3 + self.nblocks))) # placeholder for the header
+
+    def write(self, b):
+        b = memoryview(b).cast('B')
+        bs = self.compressor.blockSize
+        if self.pending:
+            n = min(bs - len(self.pending), len(b))
+            self.pending += b[:n]
+            b = b[n:]
+            if len(self.pending) == bs:
+                self._writeBlock(self.pending)
+                self.pending = bytearray()
+        while len(b) >= bs:
+            self._writeBlock(b[:bs])
+            b = b[bs:]
+        self.pending += b
+        
+    def _writeBlock(self, block):
+        if self.executor is None:
+            c = self.compressor.compress(block, self.level)
+            self.sizes.append(len(c))
+            self.stream.write(c)
+        else:
+            # Writers reuse their buffers, so the block must be copied before it is submitted.
+            # Compressed blocks are written in order, waiting for the oldest one when 
+            # there are too many blocks in flight.
+            self.compressing.append(self.executor.submit(self.compressor.compress, bytes(block), self.level))
+            if len(self.compressing) >= self.compressor.maxPending:
+                self._writeCompressed()
+
+    def _writeCompressed(self):
+        c = self.compressing.popleft().result()
+        self.sizes.append(len(c))
+        self.stream.write(c)
+
+    def close(self):
+        if self.pending:
+            self._writeBlock(self.pending)
+            self.pending = bytearray()
+        while self.compressing:
+            self._writeCompressed()
+        assert (len(self.sizes) == self.nblocks), "Number of bytes written does not match the size of the array."
+        header = [self.nblocks, self.compressor.blockSize, self.nbytes % self.compressor.blockSize] + self.sizes
+        fmt = _get_byte_order_char() + str(len(header)) + 'Q'
+        end = self.stream.tell()
+        self.stream.seek(self.headerPosition)
+        self.stream.write(struct.pack(fmt, *header))
+        self.stream.seek(end)
+
+# ================================
+#         Encoded arrays
+# ================================
+class EncodedArray:
+    """ Data array that is encoded once, i.e. converted to the bytes stored in the appended
+        section of a file, compressed or not. It can be written to many files without 
+        encoding it again, e.g. the geometry of a grid that does not change in a time series.
+        It can be used instead of a numpy array in VtkFile.addData and VtkFile.appendData.
+    """
+    def __init__(self, data, compressor = None, cacheFile = None):
+        """
+            PARAMETERS:
+                data: one numpy array or a tuple with 3 numpy arrays, as in VtkFile.appendData.
+                compressor: compressor of the files where the array will be written. See VtkFile.
+                cacheFile: file opened in binary mode for reading and writing. If given, the
+                           encoded bytes are appended to this file instead of kept in memory, 
+                           and they are copied to other files with os.copy_file_range if possible.
+        """
+        if type(data).__name__ == 'tuple':
+            assert (len(data) == 3)
+            first, self.ncomp = data[0], 3
+            write = lambda stream: writeArraysToFile(stream, data[0], data[1], data[2])
+        else:
+            first, self.ncomp = data, 1
+            write = lambda stream: writeArrayToFile(stream, data)
+        self.dtype = first.dtype
+        self.shape = first.shape
+        self.ndim = first.ndim
+        self.size = first.size
+        
+        compressor = _toCompressor(compressor)
+        self.compressed = compressor is not None
+        stream = cacheFile if cacheFile is not None else io.BytesIO()
+        self.position = stream.seek(0, io.SEEK_END)
+        if compressor:
+            level = compressor.selectLevel("", data)
+            w = CompressedBlockWriter(stream, compressor, self.ncomp * self.size * self.dtype.itemsize, level)
+            write(w)
+            w.close()
+        else:
+            write(stream) # block size is written by VtkFile
+        self.length = stream.tell() - self.position
+        
+        if cacheFile is not None:
+            cacheFile.flush()
+            self.file, self.bytes = cacheFile, None
+        else:
+            self.file, self.bytes = None, stream.getvalue()
+
+    def __len__(self):
+        return self.shape[0]
+
+    def writeTo(self, stream):
+        """ Writes encoded bytes to stream. """
+        if self.bytes is not None:
+            stream.write(self.bytes)
+        elif hasattr(os, "copy_file_range") and not isinstance(stream, PositionalWriter):
+            stream.flush()
+            start = stream.tell()
+            try:
+                n = 0
+                while n < self.length:
+                    c = os.copy_file_range(self.file.fileno(), stream.fileno(), self.length - n, 
+                                           self.position + n, start + n)
+                    if c == 0: break
+                    n += c
+                assert (n == self.length), "Cache file is shorter than expected."
+                stream.seek(start + self.length)
+            except OSError: # e.g. not supported by file system
+                stream.seek(start)
+                self._copyTo(stream)
+        else:
+            self._copyTo(stream)
+
+    def _copyTo(self, stream):
+        n = 0
+        while n < self.length:
+            size = min(WRITE_BUFFER_SIZE, self.length - n)
+            if hasattr(os, "pread"):
+                b = os.pread(self.file.fileno(), size, self.position + n)
+            else:
+                self.file.seek(self.position + n)
+                b = self.file.read(size)
+            assert (len(b) > 0), "Cache file is shorter than expected."
+            stream.write(b)
+            n += len(b)
+
+# ================================
+#        Array digests
+# ================================
+DIGEST_NAME = "sha256" # hash of hashlib used to detect unchanged arrays, usually accelerated by the CPU
+
+def arrayDigest(data, hashName = DIGEST_NAME):
+    """ Returns a digest of the type, shape and elements of an array, which can be 
+        compared with the digest of another array to check if they are equal.
+
+        PARAMETERS:
+            data: numpy array or ArraySource. Sources are read once to compute the digest.
+            hashName: name of the hash algorithm, as in hashlib.new.
+
+        RETURNS:
+            digest as bytes.
+    """
+    h = hashlib.new(hashName)
+    if isinstance(data, ArraySource):
+        h.update(("S %s %s" % (data.dtype.str, data.shape)).encode())
+        for chunk in data.chunks():
+            h.update(memoryview(np.ravel(chunk, order = 'F')).cast('B'))
+    else:
+        # contiguous arrays are hashed in their memory order, without copies
+        order = 'C' if data.flags.c_contiguous else ('F' if data.flags.f_contiguous else 'A')
+        h.update(("%s %s %s" % (order, data.dtype.str, data.shape)).encode())
+        if order == 'A': data = np.ascontiguousarray(data)
+        h.update(memoryview(data.ravel(order = 'K')).cast('B'))
+    return h.digest()
+
+class ArrayCache:
+    """ Digests and encoded arrays of the files of a series, e.g. the files of a VtkSeries.
+        When an array is equal to the array in the same position of the previous file, it is
+        encoded once as an EncodedArray and its bytes are copied to the following files 
+        until it changes, e.g. the mesh of a grid that does not move.
+        Arrays that change in every file are only hashed, not copied.
+    """
+    def __init__(self, cacheFile = None, hashName = DIGEST_NAME):
+        """
+            PARAMETERS:
+                cacheFile: file opened in binary mode for reading and writing, where encoded
+                           arrays are stored instead of memory. See EncodedArray.
+                hashName: name of the hash algorithm, as in hashlib.new.
+        """
+        self.cacheFile = cacheFile
+        self.hashName = hashName
+        self.entries = {}  # position of array in file -> (digest, EncodedArray or None)
+        self.digests = {}  # id of array -> (array, digest), cleared by newFile
+        self.reused = 0    # number of arrays copied from their encoding
+
+    def digest(self, data):
+        """ Returns digest of an array or a tuple of arrays. Digests are computed once per file. """
+        if type(data).__name__ == 'tuple':
+            return b"".join(self.digest(d) for d in data)
+        d = self.digests.get(id(data))
+        if d is None:
+            d = (data, arrayDigest(data, self.hashName)) # keeps array alive, so its id is not reused
+            self.digests[id(data)] = d
+        return d[1]
+
+    def newFile(self):
+        """ Forgets digests computed for the previous file. Arrays may have been modified in place. """
+        self.digests = {}
+
+    def lookup(self, key, data, compressor):
+        """ Returns an EncodedArray if data did not change since the previous file, 
+            otherwise returns data.
+
+            PARAMETERS:
+                key: position of the array in the file.
+                data: array or tuple of arrays, as in VtkFile.appendData.
+                compressor: compressor of the file.
+        """
+        digest = self.digest(data)
+        key = (key, compressor is not None)
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != digest:
+            self.entries[key] = (digest, None)
+            return data
+        if entry[1] is None:
+            entry = (digest, EncodedArray(data, compressor, self.cacheFile))
+            self.entries[key] = entry
+        self.reused += 1
+        return entry[1]
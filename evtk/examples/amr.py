@@ -0,0 +1,63 @@
+#! /usr/bin/env python
+
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2021 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+# **************************************************************
+# * Example of how to export an overlapping AMR hierarchy      *
+# * (.vthb) of image patches.                                  *
+# **************************************************************
+import os
+import shutil
+from evtk.hl import amrToVTK
+import numpy as np
+
+FILE_PATH = "./amr"
+def clean():
+    try:
+        os.remove(FILE_PATH + ".vthb")
+    except:
+        pass
+    shutil.rmtree(FILE_PATH, ignore_errors = True)
+
+def patch(origin, spacing, n):
+    # Patch of n x n x n cells with a smooth field
+    x = origin[0] + spacing * (np.arange(n) + 0.5)
+    xx, yy, zz = np.meshgrid(x, x, x, indexing = 'ij')
+    return {"origin" : origin, "spacing" : (spacing, spacing, spacing),
+            "cellData" : {"temp" : np.exp(-((xx - 0.5)**2 + (yy - 0.5)**2 + (zz - 0.5)**2) * 10.0)}}
+
+def run():
+    print("Running amr...")
+    levels = [ [patch((0.0, 0.0, 0.0), 0.1, 10)],                                       # coarse level
+               [patch((0.2, 0.2, 0.2), 0.05, 6), patch((0.5, 0.5, 0.5), 0.05, 6)],     # refined by 2
+               [],                                                                       # no patches
+               [patch((0.4, 0.4, 0.4), 0.0125, 8)] ]                                     # refined by 2 three times
+    amrToVTK(FILE_PATH, levels, compressor = True)
+
+    # The empty level is kept, so the last level keeps its index
+    with open(FILE_PATH + ".vthb") as f:
+        text = f.read()
+    assert ('level="2"' in text and 'level="3"' in text)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,71 @@
+#! /usr/bin/env python
+
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2021 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+# **************************************************************
+# * Example of how to write files from asyncio code without    *
+# * blocking the event loop.                                   *
+# **************************************************************
+import asyncio
+import os
+from evtk import aio
+import numpy as np
+
+FILE_PATH = "./asyncio"
+NFILES = 4
+def clean():
+    for f in [FILE_PATH + ".pvd", FILE_PATH + "_slow.vti"] + ["%s_%d.vti" % (FILE_PATH, i) for i in range(NFILES)]:
+        try:
+            os.remove(f)
+        except:
+            pass
+
+async def main():
+    nx, ny, nz = 30, 30, 30
+    fields = [np.random.rand(nx, ny, nz) for i in range(NFILES)]
+
+    # Files are written at the same time by the default executor of the loop
+    files = await asyncio.gather(*[aio.imageToVTK("%s_%d" % (FILE_PATH, i), cellData = {"pressure" : f}, compressor = True)
+                                   for i, f in enumerate(fields)])
+    g = aio.AsyncVtkGroup(FILE_PATH)
+    for i, f in enumerate(files):
+        await g.addFile(f, float(i))
+    await g.save()
+
+    # A cancelled export removes its partial files, but not the files of other exports
+    task = asyncio.ensure_future(aio.imageToVTK(FILE_PATH + "_slow", cellData = {"pressure" : np.random.rand(200, 200, 100)}, 
+                                                compressor = 9))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        assert not os.path.exists(FILE_PATH + "_slow.vti")
+    assert all(os.path.exists(f) for f in files)
+
+def run():
+    print("Running asyncio_writers...")
+    asyncio.run(main())
+
+if __name__ == "__main__":
+    run()
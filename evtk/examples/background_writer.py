@@ -0,0 +1,61 @@
+#! /usr/bin/env python
+
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2021 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+# **************************************************************
+# * Example of how to export snapshots of a simulation in      *
+# * background, while the simulation continues.               *
+# **************************************************************
+import os
+from evtk.hl import imageToVTK
+from evtk.background import AsyncWriter
+from evtk.reader import VtkFileReader
+import numpy as np
+
+FILE_PATH = "./background"
+NSTEPS = 5
+def clean():
+    for i in range(NSTEPS):
+        try:
+            os.remove("%s_%d.vti" % (FILE_PATH, i))
+        except:
+            pass
+
+def run():
+    print("Running background_writer...")
+    nx, ny, nz = 40, 40, 40
+    pressure = np.zeros((nx, ny, nz))
+
+    # Two sets of buffers: a snapshot is copied while the previous one is written
+    with AsyncWriter(maxPending = 2) as w:
+        for step in range(NSTEPS):
+            pressure += 1.0 # the simulation modifies its arrays in place
+            w.submit(imageToVTK, "%s_%d" % (FILE_PATH, step), cellData = {"pressure" : pressure}, compressor = True)
+
+    # Each file has the data of its step
+    for step in range(NSTEPS):
+        with VtkFileReader("%s_%d.vti" % (FILE_PATH, step)) as r:
+            assert np.all(r.getArray("pressure") == step + 1.0)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,69 @@
+#! /usr/bin/env python
+
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2021 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+# **************************************************************
+# * Example of how to convert many arrays stored in .npy and   *
+# * .npz files to VTK files with a pool of workers.            *
+# **************************************************************
+import os
+from evtk.hl import imageToVTK, rectilinearToVTK
+from evtk.batch import NpyArray, ExportJob, exportBatch
+import numpy as np
+
+FILE_PATH = "./batch"
+NFILES = 6
+def clean():
+    for i in range(NFILES):
+        for ext in (".npy", ".vti", ".npz", ".vtr"):
+            try:
+                os.remove("%s_%d%s" % (FILE_PATH, i, ext))
+            except:
+                pass
+
+def run():
+    print("Running batch_export...")
+    nx, ny, nz = 20, 20, 20
+    x = np.linspace(0.0, 1.0, nx + 1)
+    for i in range(NFILES):
+        np.save("%s_%d.npy" % (FILE_PATH, i), np.random.rand(nx, ny, nz))
+        np.savez("%s_%d.npz" % (FILE_PATH, i), pressure = np.random.rand(nx, ny, nz), x = x)
+
+    # Arrays are only loaded by the worker that writes them. Their size is read from
+    # the header of the file, so at most maxMemory bytes are loaded at the same time.
+    jobs = [ExportJob(imageToVTK, "%s_%d" % (FILE_PATH, i), cellData = {"temp" : NpyArray("%s_%d.npy" % (FILE_PATH, i))}, 
+                      compressor = True) for i in range(NFILES)]
+    report = exportBatch(jobs, nworkers = 2, maxMemory = 2 * nx * ny * nz * 8)
+    assert (report.paths == [os.path.abspath("%s_%d.vti" % (FILE_PATH, i)) for i in range(NFILES)])
+
+    # Processes receive the jobs with pickle, and load the arrays themselves
+    jobs = []
+    for i in range(NFILES):
+        npz = "%s_%d.npz" % (FILE_PATH, i)
+        c = NpyArray(npz, "x")
+        jobs.append(ExportJob(rectilinearToVTK, "%s_%d" % (FILE_PATH, i), c, c, c, cellData = {"pressure" : NpyArray(npz, "pressure")}))
+    report = exportBatch(jobs, nworkers = 2, processes = True)
+    print("  " + str(report))
+
+if __name__ == "__main__":
+    run()
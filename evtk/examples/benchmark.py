@@ -0,0 +1,183 @@
+#! /usr/bin/env python
+
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2021 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+# **************************************************************
+# * Throughput of writeArrayToFile and writeArraysToFile,      *
+# * compared with the original implementation, which packed    *
+# * the arrays with struct, and time to write the XML header   *
+# * of a file, compared with the original XmlWriter, which     *
+# * wrote each piece of text. Output must be byte-identical.   *
+# **************************************************************
+import io
+import os
+import shutil
+import struct
+import tempfile
+import time
+from evtk.evtk import writeArrayToFile, writeArraysToFile, np_to_struct, _get_byte_order_char
+from evtk.xml import XmlWriter
+import numpy as np
+
+# Minimum throughput in MB/s. The struct implementation wrote a few MB/s.
+MIN_THROUGHPUT = 100.0
+SIZE = 64 * 1024 * 1024 # bytes of the arrays whose throughput is measured
+# Minimum number of headers with HEADER_ARRAYS data arrays written per second.
+MIN_HEADERS = 500.0
+HEADER_ARRAYS = 50
+
+def clean():
+    pass
+
+def structArrayToFile(stream, data):
+    # Original implementation of writeArrayToFile
+    fmt = _get_byte_order_char() + str(data.size) + np_to_struct[data.dtype.name]
+    dd = np.ravel(data, order='F')
+    stream.write(struct.pack(fmt, *dd))
+
+def structArraysToFile(stream, x, y, z):
+    # Original implementation of writeArraysToFile
+    fmt = _get_byte_order_char() + str(1) + np_to_struct[x.dtype.name]
+    xx, yy, zz = np.ravel(x, order='F'), np.ravel(y, order='F'), np.ravel(z, order='F')
+    for i in range(x.size):
+        stream.write(struct.pack(fmt, xx[i]))
+        stream.write(struct.pack(fmt, yy[i]))
+        stream.write(struct.pack(fmt, zz[i]))
+
+class StreamXmlWriter:
+    # Original implementation of XmlWriter, which wrote each piece of text to the file
+    def __init__(self, filepath):
+        self.stream = open(filepath, "wb")
+        self.openTag = False
+        self.stream.write(b'<?xml version="1.0"?>')
+
+    def openElement(self, tag):
+        if self.openTag: self.stream.write(b">")
+        self.stream.write(("\n<%s" % tag).encode("ASCII"))
+        self.openTag = True
+        return self
+
+    def closeElement(self, tag = None):
+        if tag:
+            if self.openTag:
+                self.stream.write(b">")
+                self.openTag = False
+            self.stream.write(("\n</%s>" % tag).encode("ASCII"))
+        else:
+            self.stream.write(b"/>")
+            self.openTag = False
+        return self
+
+    def addText(self, text):
+        if self.openTag:
+            self.stream.write(b">\n")
+            self.openTag = False
+        self.stream.write(text.encode("ASCII"))
+        return self
+
+    def addAttributes(self, **kwargs):
+        for key in kwargs:
+            self.stream.write((' %s="%s"' % (key, kwargs[key])).encode("ASCII"))
+        return self
+
+    def close(self):
+        self.stream.close()
+
+def writeHeader(xml, narrays):
+    # Header of an image data file with narrays cell arrays, as written by VtkFile
+    xml.openElement("VTKFile").addAttributes(type = "ImageData", version = "1.0", byte_order = "LittleEndian", header_type = "UInt64")
+    xml.openElement("ImageData").addAttributes(WholeExtent = "0 10 0 10 0 10", Origin = "0.0 0.0 0.0 ", Spacing = "1.0 1.0 1.0 ")
+    xml.openElement("Piece").addAttributes(Extent = "0 10 0 10 0 10")
+    xml.openElement("CellData")
+    for i in range(narrays):
+        xml.openElement("DataArray").addAttributes(Name = "array_%d" % i, NumberOfComponents = 1, 
+                                                   type = "Float64", format = "appended", offset = i * 8008)
+        xml.closeElement()
+    xml.closeElement("CellData")
+    xml.closeElement("Piece")
+    xml.closeElement("ImageData")
+    xml.openElement("AppendedData").addAttributes(encoding = "raw").addText("_")
+    xml.close()
+
+def headerRate(newWriter, path, narrays):
+    # Headers written per second, including opening and closing the file
+    n, start = 0, time.perf_counter()
+    while n < 10 or time.perf_counter() - start < 0.2:
+        writeHeader(newWriter(path), narrays)
+        n += 1
+    return n / (time.perf_counter() - start)
+
+def check(write, reference, *arrays):
+    new, old = io.BytesIO(), io.BytesIO()
+    write(new, *arrays)
+    reference(old, *arrays)
+    assert (new.getvalue() == old.getvalue()), "Output differs from struct implementation."
+
+def throughput(write, *arrays):
+    stream = io.BytesIO()
+    start = time.perf_counter()
+    write(stream, *arrays)
+    elapsed = time.perf_counter() - start
+    return stream.tell() / 1.0e6 / max(elapsed, 1.0e-9)
+
+def run():
+    print("Running benchmark...")
+    
+    # Output is the same for all types and memory orders
+    for dtype in np_to_struct:
+        a = (np.random.rand(7, 6, 5) * 100).astype(dtype)
+        check(writeArrayToFile, structArrayToFile, a)
+        check(writeArrayToFile, structArrayToFile, np.asfortranarray(a))
+        check(writeArrayToFile, structArrayToFile, a.ravel())
+        check(writeArraysToFile, structArraysToFile, a, a + 1, np.asfortranarray(a))
+
+    n = SIZE // 8
+    nx = int(round(n ** (1.0 / 3.0)))
+    scalar = np.random.rand(nx, nx, nx)
+    results = [ ("1D array", throughput(writeArrayToFile, scalar.ravel())),
+                ("3D array, Fortran order", throughput(writeArrayToFile, np.asfortranarray(scalar))),
+                ("3D array, C order", throughput(writeArrayToFile, scalar)),
+                ("vector of 1D arrays", throughput(writeArraysToFile, *[np.random.rand(n // 3) for i in range(3)])) ]
+    for name, speed in results:
+        print("  %-25s %8.1f MB/s" % (name, speed))
+        assert (speed >= MIN_THROUGHPUT), "Throughput of %s is lower than %.1f MB/s" % (name, MIN_THROUGHPUT)
+
+    # Headers are assembled in memory by VtkFile, and written with a single call
+    root = tempfile.mkdtemp()
+    try:
+        new, old = os.path.join(root, "new.xml"), os.path.join(root, "old.xml")
+        for narrays in (5, HEADER_ARRAYS, 500):
+            writeHeader(XmlWriter(new, buffered = True), narrays)
+            writeHeader(StreamXmlWriter(old), narrays)
+            with open(new, "rb") as a, open(old, "rb") as b:
+                assert (a.read() == b.read()), "Header differs from original XmlWriter."
+            rate = headerRate(lambda p: XmlWriter(p, buffered = True), new, narrays)
+            oldRate = headerRate(StreamXmlWriter, old, narrays)
+            print("  header with %3d arrays %8.1f us (original %8.1f us)" % (narrays, 1.0e6 / rate, 1.0e6 / oldRate))
+            if narrays == HEADER_ARRAYS:
+                assert (rate >= MIN_HEADERS), "Less than %.1f headers per second" % MIN_HEADERS
+    finally:
+        shutil.rmtree(root, ignore_errors = True)
+
+if __name__ == "__main__":
+    run()
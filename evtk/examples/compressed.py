@@ -0,0 +1,59 @@
+#! /usr/bin/env python
+
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2024 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# **************************************************************
+# * Example of how to export compressed data with zlib.        *
+# **************************************************************
+import os
+from evtk.hl import imageToVTK
+from evtk.vtk import ZlibCompressor
+import numpy as np
+
+FILE_PATH = "./compressed"
+def clean():
+    try:
+        os.remove(FILE_PATH + ".vti")
+    except:
+        pass
+        
+def run():
+    print("Running compressed...")
+
+    # Dimensions
+    nx, ny, nz = 60, 60, 20
+    x = np.linspace(0.0, 1.0, nx + 1)
+    y = np.linspace(0.0, 1.0, ny + 1)
+    z = np.linspace(0.0, 1.0, nz + 1)
+    xx, yy, zz = np.meshgrid(x, y, z, indexing = 'ij')
+
+    # Smooth fields usually compress well
+    temp = np.sin(2.0 * np.pi * xx) * np.cos(2.0 * np.pi * yy) + zz
+    
+    # compressor = True uses the default level and block size
+    compressor = ZlibCompressor(level = 6, blockSize = 32768)
+    imageToVTK(FILE_PATH, pointData = {"temp" : temp}, compressor = compressor)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,78 @@
+#! /usr/bin/env python
+
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2021 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+# **************************************************************
+# * Example of how to convert .npy/.npz snapshots to VTK files *
+# * with the evtk-convert command (evtk.cli).                  *
+# **************************************************************
+import contextlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+from evtk import cli
+import numpy as np
+
+def clean():
+    pass # files are written to a temporary directory
+
+def run():
+    print("Running convert...")
+    nx, ny, nz = 8, 6, 4
+    root = tempfile.mkdtemp()
+    try:
+        inputs = os.path.join(root, "snapshots")
+        os.makedirs(inputs)
+        # Names with a - separator: times are 1, 2, 3 (not -1, -2, -3)
+        for step in (3, 1, 2):
+            np.savez(os.path.join(inputs, "snap-%03d.npz" % step), p = np.full((nx, ny, nz), float(step)),
+                     u = np.random.rand(nx + 1, ny + 1, nz + 1), v = np.random.rand(nx + 1, ny + 1, nz + 1),
+                     w = np.random.rand(nx + 1, ny + 1, nz + 1))
+        # Coordinates are the same for all snapshots
+        np.savez(os.path.join(root, "grid.npz"), x = np.linspace(0.0, 1.0, nx + 1), 
+                 y = np.linspace(0.0, 1.0, ny + 1), z = np.linspace(0.0, 1.0, nz + 1))
+        config = os.path.join(root, "convert.json")
+        with open(config, "w") as f:
+            json.dump({"grid" : "rectilinear", "coordinates" : ["grid.npz:x", "grid.npz:y", "grid.npz:z"],
+                       "cellData" : {"pressure" : "p"}, "pointData" : {"velocity" : ["u", "v", "w"]},
+                       "compressor" : True}, f)
+
+        output = os.path.join(root, "vtk")
+        status = cli.main([config, inputs, "-o", output, "-g", "series", "-j", "2", "-q"])
+        assert (status == 0)
+        with open(os.path.join(output, "series.pvd")) as f:
+            entries = re.findall(r'timestep="([^"]*)"[^>]*file="([^"]*)"', f.read())
+        assert (entries == [("1.0", "snap-001.vtr"), ("2.0", "snap-002.vtr"), ("3.0", "snap-003.vtr")])
+        
+        # Errors in the configuration are reported with exit status 2
+        with contextlib.redirect_stderr(io.StringIO()) as err:
+            assert (cli.main([config, os.path.join(root, "grid.npz"), "-o", output, "-q"]) == 2)
+        assert ("error" in err.getvalue())
+    finally:
+        shutil.rmtree(root, ignore_errors = True)
+
+if __name__ == "__main__":
+    run()
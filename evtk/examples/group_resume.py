@@ -0,0 +1,73 @@
+#! /usr/bin/env python
+
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2021 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+# **************************************************************
+# * Example of how to resume a VTK group after the program     *
+# * that was writing it was killed, e.g. a restarted           *
+# * simulation.                                                *
+# **************************************************************
+import os
+import subprocess
+import sys
+from evtk.vtk import VtkGroup
+
+FILE_PATH = "./group_resume"
+NSTEPS = 2000
+
+# The writer exits without closing the group or flushing its buffers, as if it was killed
+WRITER = """
+import os
+from evtk.vtk import VtkGroup
+g = VtkGroup("%s", incremental = %s)
+for i in range(%d):
+    g.addFile(filepath = "sim%%04d.vtu" %% i, sim_time = float(i))
+os._exit(1)
+"""
+
+def clean():
+    try:
+        os.remove(FILE_PATH + ".pvd")
+    except:
+        pass
+
+def run():
+    print("Running group_resume...")
+    for incremental in (False, True):
+        subprocess.run([sys.executable, "-c", WRITER % (FILE_PATH, incremental, NSTEPS)])
+        g = VtkGroup(FILE_PATH, incremental = incremental, resume = True)
+        n = len(g.datasets)
+        if incremental:
+            # Each entry is written to the file as soon as it is added
+            assert (n == NSTEPS)
+        # Steps that were lost are written again
+        for i in range(n, NSTEPS):
+            g.addFile(filepath = "sim%04d.vtu" % i, sim_time = float(i))
+        g.save()
+        
+        g = VtkGroup(FILE_PATH, resume = True)
+        assert ([d["file"] for d in g.datasets] == ["sim%04d.vtu" % i for i in range(NSTEPS)])
+        g.save()
+
+if __name__ == "__main__":
+	run()
@@ -0,0 +1,93 @@
+#! /usr/bin/env python
+
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2021 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+# **************************************************************
+# * Example of how to reuse the header of the first file of a  *
+# * time series to write the following steps.                  *
+# **************************************************************
+import os
+from evtk.hl import rectilinearToVTK, unstructuredGridToVTK
+from evtk.vtk import VtkLayout, VtkTriangle
+import numpy as np
+
+FILE_PATH = "./layout"
+NSTEPS = 3
+def clean():
+    for step in range(NSTEPS):
+        for name in ("grid", "grid_ref", "mesh", "mesh_ref"):
+            for ext in (".vtr", ".vtu"):
+                try:
+                    os.remove("%s_%s_%d%s" % (FILE_PATH, name, step, ext))
+                except:
+                    pass
+    for ext in (".vtr", ".vtu"):
+        try:
+            os.remove(FILE_PATH + "_bad" + ext)
+        except:
+            pass
+
+def same(a, b):
+    with open(a, "rb") as fa, open(b, "rb") as fb:
+        return fa.read() == fb.read()
+
+def run():
+    print("Running layout...")
+    nx, ny, nz = 8, 6, 4
+    x = np.linspace(0.0, 1.0, nx + 1)
+    y = np.linspace(0.0, 1.0, ny + 1)
+    z = np.linspace(0.0, 1.0, nz + 1)
+    px, py, pz = np.array([0.0, 1.0, 0.0, 1.0]), np.array([0.0, 0.0, 1.0, 1.0]), np.zeros(4)
+    conn, offsets = np.array([0, 1, 2, 1, 3, 2]), np.array([3, 6])
+    ctype = np.array([VtkTriangle.tid, VtkTriangle.tid])
+
+    for compressor in (None, True):
+        grid, mesh = VtkLayout(), VtkLayout() # one layout for each kind of file
+        for step in range(NSTEPS):
+            pressure = np.random.rand(nx, ny, nz)
+            vel = (np.random.rand(nx + 1, ny + 1, nz + 1), np.random.rand(nx + 1, ny + 1, nz + 1), np.zeros((nx + 1, ny + 1, nz + 1)))
+            area = np.random.rand(2)
+            # The first step records the header, the following ones only write their arrays
+            a = rectilinearToVTK("%s_grid_%d" % (FILE_PATH, step), x, y, z, cellData = {"pressure" : pressure}, 
+                                 pointData = {"vel" : vel}, compressor = compressor, layout = grid)
+            b = rectilinearToVTK("%s_grid_ref_%d" % (FILE_PATH, step), x, y, z, cellData = {"pressure" : pressure}, 
+                                 pointData = {"vel" : vel}, compressor = compressor)
+            assert same(a, b)
+            a = unstructuredGridToVTK("%s_mesh_%d" % (FILE_PATH, step), px, py, pz, conn, offsets, ctype, 
+                                      cellData = {"area" : area}, compressor = compressor, layout = mesh)
+            b = unstructuredGridToVTK("%s_mesh_ref_%d" % (FILE_PATH, step), px, py, pz, conn, offsets, ctype,
+                                      cellData = {"area" : area}, compressor = compressor)
+            assert same(a, b)
+            assert grid.isRecorded() and mesh.isRecorded()
+
+        # Files with other arrays do not match the layout
+        for cellData in ({"temperature" : np.random.rand(nx, ny, nz)}, {"pressure" : np.random.rand(nx, ny, nz + 1)}):
+            try:
+                rectilinearToVTK(FILE_PATH + "_bad", x, y, z, cellData = cellData, pointData = {"vel" : vel}, 
+                                 compressor = compressor, layout = grid)
+                assert False, "Layout was not checked."
+            except AssertionError as e:
+                assert str(e).startswith("File does not match its layout"), str(e)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,67 @@
+#! /usr/bin/env python
+
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2021 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+# **************************************************************
+# * Example of how to export the outputs of a time step to a   *
+# * multiblock file (.vtm), with a boundary that is written    *
+# * once and shared by all the steps.                          *
+# **************************************************************
+import os
+import shutil
+from evtk.hl import Block, multiBlockToVTK, imageToVTK, pointsToVTK
+from evtk.vtk import VtkGroup
+import numpy as np
+
+FILE_PATH = "./multiblock"
+NSTEPS = 3
+def clean():
+    for f in [FILE_PATH + ".pvd"] + ["%s_%d.vtm" % (FILE_PATH, i) for i in range(NSTEPS)]:
+        try:
+            os.remove(f)
+        except:
+            pass
+    for d in ["%s_%d" % (FILE_PATH, i) for i in range(NSTEPS)]:
+        shutil.rmtree(d, ignore_errors = True)
+
+def run():
+    print("Running multiblock...")
+    nx, ny, nz = 10, 10, 5
+    
+    # Written with the first step only
+    wall = Block(pointsToVTK, np.linspace(0.0, 1.0, 20), np.zeros(20), np.zeros(20), 
+                 data = {"id" : np.arange(20.0)})
+
+    g = VtkGroup(FILE_PATH)
+    for step in range(NSTEPS):
+        blocks = {"fluid" : Block(imageToVTK, cellData = {"pressure" : np.random.rand(nx, ny, nz)}),
+                  "boundaries" : {"wall" : wall}}
+        f = multiBlockToVTK("%s_%d" % (FILE_PATH, step), blocks, nthreads = 2)
+        g.addFile(filepath = f, sim_time = float(step))
+    g.save()
+    
+    assert (wall.file == os.path.abspath(FILE_PATH + "_0/boundaries_wall.vtu"))
+    assert not os.path.exists(FILE_PATH + "_1/boundaries_wall.vtu")
+
+if __name__ == "__main__":
+    run()
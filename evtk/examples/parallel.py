@@ -0,0 +1,87 @@
+#! /usr/bin/env python
+
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2021 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+# **************************************************************
+# * Example of how to export a grid in pieces written by a     *
+# * pool of processes, with a parallel file (.pvti, .pvtr,     *
+# * .pvts, .pvtu) that references them.                        *
+# **************************************************************
+import glob
+import os
+from evtk.hl import parallelImageToVTK, parallelRectilinearToVTK, parallelStructuredToVTK, parallelUnstructuredGridToVTK
+from evtk.vtk import VtkTriangle
+from evtk.reader import VtkFileReader
+import numpy as np
+
+FILE_PATH = "./parallel"
+def clean():
+    for f in glob.glob(FILE_PATH + "_*.*"):
+        try:
+            os.remove(f)
+        except:
+            pass
+
+def run():
+    print("Running parallel...")
+
+    # Dimensions
+    nx, ny, nz = 12, 10, 8
+    x = np.linspace(0.0, 1.0, nx + 1)
+    y = np.linspace(0.0, 1.0, ny + 1)
+    z = np.linspace(0.0, 1.0, nz + 1)
+    xx, yy, zz = np.meshgrid(x, y, z, indexing = 'ij')
+    pressure = np.random.rand(nx, ny, nz)
+    temp = xx + yy + zz
+
+    # 4 pieces written by 2 processes
+    parallelImageToVTK(FILE_PATH + "_image", 4, spacing = (x[1], y[1], z[1]), cellData = {"pressure" : pressure}, 
+                       pointData = {"temp" : temp}, nprocs = 2)
+    parallelRectilinearToVTK(FILE_PATH + "_rect", 4, x, y, z, cellData = {"pressure" : pressure}, nprocs = 2)
+    parallelStructuredToVTK(FILE_PATH + "_struct", 4, xx, yy, zz, pointData = {"temp" : temp}, 
+                            compressor = True, nprocs = 2)
+
+    # Each piece stores its extent in the whole grid
+    cells = 0
+    for i in range(4):
+        with VtkFileReader("%s_image_%d.vti" % (FILE_PATH, i)) as r:
+            s, e = r.pieces[0].extent()[0::2], r.pieces[0].extent()[1::2]
+            p = r.getArray("pressure")
+            assert np.array_equal(p, pressure[s[0]:e[0], s[1]:e[1], s[2]:e[2]])
+            cells += p.size
+    assert (cells == pressure.size)
+
+    # Unstructured grids are given as a list of pieces, e.g. the partitions of a mesh
+    pieces = []
+    for i in range(3):
+        px = np.array([0.0, 1.0, 0.0, 1.0]) + i
+        py = np.array([0.0, 0.0, 1.0, 1.0])
+        pz = np.zeros(4)
+        pieces.append({"x" : px, "y" : py, "z" : pz,
+                       "connectivity" : np.array([0, 1, 2, 1, 3, 2]), "offsets" : np.array([3, 6]), 
+                       "cell_types" : np.array([VtkTriangle.tid, VtkTriangle.tid]),
+                       "cellData" : {"rank" : np.array([float(i), float(i)])}})
+    parallelUnstructuredGridToVTK(FILE_PATH + "_unstructured", pieces, nprocs = 2)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,75 @@
+#! /usr/bin/env python
+
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2021 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+# **************************************************************
+# * Example of how to export a mesh made of several pieces,    *
+# * e.g. the partitions of a domain, to a single file.         *
+# **************************************************************
+import os
+from evtk.hl import unstructuredGridPiecesToVTK, polyDataPiecesToVTK
+from evtk.vtk import VtkQuad
+from evtk.reader import VtkFileReader
+import numpy as np
+
+FILE_PATH = "./pieces"
+def clean():
+    for ext in (".vtu", ".vtp"):
+        try:
+            os.remove(FILE_PATH + ext)
+        except:
+            pass
+
+def quads(nx, x0):
+    # Grid of nx by 1 quads starting at x0, numbered from its first point
+    x = np.tile(np.arange(nx + 1, dtype = "float64") + x0, 2)
+    y = np.repeat([0.0, 1.0], nx + 1)
+    z = np.zeros(2 * (nx + 1))
+    i = np.arange(nx)
+    conn = np.column_stack([i, i + 1, i + nx + 2, i + nx + 1]).ravel()
+    return x, y, z, conn, 4 * (i + 1)
+
+def run():
+    print("Running pieces...")
+
+    pieces, surfaces = [], []
+    for p, nx in enumerate((3, 5, 2)):
+        x, y, z, conn, offsets = quads(nx, 10.0 * p)
+        pieces.append({"x" : x, "y" : y, "z" : z, "connectivity" : conn, "offsets" : offsets,
+                       "cell_types" : np.full(nx, VtkQuad.tid), 
+                       "cellData" : {"partition" : np.full(nx, float(p))},
+                       "pointData" : {"x" : x}})
+        surfaces.append({"x" : x, "y" : y, "z" : z, "polys" : (conn, offsets),
+                         "cellData" : {"partition" : np.full(nx, float(p))}})
+    unstructuredGridPiecesToVTK(FILE_PATH, pieces)
+    polyDataPiecesToVTK(FILE_PATH, surfaces, compressor = True)
+
+    # Each Piece element keeps the arrays of its piece
+    for ext in (".vtu", ".vtp"):
+        with VtkFileReader(FILE_PATH + ext) as r:
+            assert (len(r.pieces) == 3)
+            for p, piece in enumerate(pieces):
+                assert np.array_equal(r.getArray("partition", piece = p), piece["cellData"]["partition"])
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,75 @@
+#! /usr/bin/env python
+
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2021 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+# **************************************************************
+# * Example of how to read back the arrays of files written    *
+# * by EVTK, e.g. to verify them or to restart a simulation.   *
+# **************************************************************
+import os
+from evtk.hl import structuredToVTK, unstructuredGridToVTK
+from evtk.vtk import VtkTriangle
+from evtk.reader import VtkFileReader, readVTK
+import numpy as np
+
+FILE_PATH = "./read_back"
+def clean():
+    for ext in (".vts", ".vtu"):
+        try:
+            os.remove(FILE_PATH + ext)
+        except:
+            pass
+
+def run():
+    print("Running read_back...")
+    nx, ny, nz = 6, 5, 4
+    x = np.linspace(0.0, 1.0, nx + 1)
+    y = np.linspace(0.0, 2.0, ny + 1)
+    z = np.linspace(0.0, 3.0, nz + 1)
+    xx, yy, zz = np.meshgrid(x, y, z, indexing = 'ij')
+    pressure = np.random.rand(nx, ny, nz)
+    vel = (xx, yy, zz)
+
+    for compressor in (None, True):
+        structuredToVTK(FILE_PATH, xx, yy, zz, cellData = {"pressure" : pressure}, 
+                        pointData = {"vel" : vel}, compressor = compressor)
+        with VtkFileReader(FILE_PATH + ".vts") as r:
+            # Arrays have the shape of the grid, with components in the last dimension
+            assert np.array_equal(r.getArray("pressure"), pressure)
+            v = r.getArray("vel")
+            assert (v.shape == (nx + 1, ny + 1, nz + 1, 3))
+            for i in range(3): assert np.array_equal(v[..., i], vel[i])
+            assert np.array_equal(r.getArray("points")[..., 2], zz)
+
+    # Unstructured grids: one dictionary of sections for each piece
+    px, py, pz = np.array([0.0, 1.0, 0.0, 1.0]), np.array([0.0, 0.0, 1.0, 1.0]), np.zeros(4)
+    conn, offsets = np.array([0, 1, 2, 1, 3, 2]), np.array([3, 6])
+    ctype = np.array([VtkTriangle.tid, VtkTriangle.tid])
+    unstructuredGridToVTK(FILE_PATH, px, py, pz, conn, offsets, ctype, cellData = {"area" : np.array([0.5, 0.5])})
+    piece = readVTK(FILE_PATH + ".vtu")[0]
+    assert np.array_equal(piece["Cells"]["connectivity"], conn)
+    assert np.array_equal(piece["Points"]["points"][:, 0], px)
+    assert np.array_equal(piece["CellData"]["area"], [0.5, 0.5])
+
+if __name__ == "__main__":
+    run()
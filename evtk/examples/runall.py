@@ -1,6 +1,9 @@
 import shutil
 
+import benchmark
+import compressed
 import group
+import group_resume
 import image
 import lines
 import points
@@ -9,6 +12,20 @@ import rectilinear
 import structured 
 import unstructured 
 import lowlevel
+import sources
+import layout
+import shared_group
+import convert
+import read_back
+import batch_export
+import writer_process
+import asyncio_writers
+import background_writer
+import series
+import amr
+import multiblock
+import pieces
+import parallel
 
 def testit(test):
     try:
@@ -17,7 +34,10 @@ def testit(test):
         print("  FAILED")
 
 def clean_all():
+    benchmark.clean()
+    compressed.clean()
     group.clean()
+    group_resume.clean()
     image.clean()
     lines.clean()
     points.clean()
@@ -26,13 +46,30 @@ def clean_all():
     structured.clean()
     unstructured.clean()
     lowlevel.clean()
+    sources.clean()
+    layout.clean()
+    shared_group.clean()
+    convert.clean()
+    read_back.clean()
+    batch_export.clean()
+    writer_process.clean()
+    asyncio_writers.clean()
+    background_writer.clean()
+    series.clean()
+    amr.clean()
+    multiblock.clean()
+    pieces.clean()
+    parallel.clean()
     try:
         shutil.rmtree("__pycache__")
     except:
         pass
     
 def test_all():
+    testit(benchmark.run)
+    testit(compressed.run)
     testit(group.run)
+    testit(group_resume.run)
     testit(image.run)
     testit(lines.run)
     testit(points.run)
@@ -41,6 +78,20 @@ def test_all():
     testit(structured.run)
     testit(unstructured.run)
     testit(lowlevel.run)
+    testit(sources.run)
+    testit(layout.run)
+    testit(shared_group.run)
+    testit(convert.run)
+    testit(read_back.run)
+    testit(batch_export.run)
+    testit(writer_process.run)
+    testit(asyncio_writers.run)
+    testit(background_writer.run)
+    testit(series.run)
+    testit(amr.run)
+    testit(multiblock.run)
+    testit(pieces.run)
+    testit(parallel.run)
 
 if __name__ == "__main__":
     import sys
@@ -0,0 +1,76 @@
+#! /usr/bin/env python
+
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2021 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+# **************************************************************
+# * Example of how to export a time series whose mesh does not *
+# * change, and whose fields only change in some steps.        *
+# **************************************************************
+import os
+import shutil
+from evtk.hl import unstructuredGridToVTK, multiBlockToVTK, Block, imageToVTK
+from evtk.vtk import VtkSeries, VtkHexahedron
+import numpy as np
+
+FILE_PATH = "./series"
+NSTEPS = 6
+def clean():
+    for f in [FILE_PATH + ".pvd", FILE_PATH + "_blocks.vtm"] + ["%s_%d.vtu" % (FILE_PATH, i) for i in range(NSTEPS)]:
+        try:
+            os.remove(f)
+        except:
+            pass
+    shutil.rmtree(FILE_PATH + "_blocks", ignore_errors = True)
+
+def run():
+    print("Running series...")
+
+    # Mesh of n hexahedra along x
+    n = 1000
+    x = np.repeat(np.arange(n + 1, dtype = "float64"), 4)
+    y = np.tile([0.0, 1.0, 1.0, 0.0], n + 1)
+    z = np.tile([0.0, 0.0, 1.0, 1.0], n + 1)
+    i = 4 * np.arange(n)
+    conn = np.column_stack([i, i + 1, i + 2, i + 3, i + 4, i + 5, i + 6, i + 7]).ravel()
+    offsets = 8 * (np.arange(n) + 1)
+    ctype = np.full(n, VtkHexahedron.tid)
+
+    s = VtkSeries(FILE_PATH)
+    temp = np.zeros(n)
+    for step in range(NSTEPS):
+        if step % 2 == 0: temp = temp + 1.0 # temperature changes every other step
+        s.addStep(step / 10.0, unstructuredGridToVTK, "%s_%d" % (FILE_PATH, step), x, y, z, 
+                  conn, offsets, ctype, cellData = {"temp" : temp})
+    # Writers without an arrayCache parameter write all their arrays
+    s.addStep(NSTEPS / 10.0, multiBlockToVTK, FILE_PATH + "_blocks", 
+              {"grid" : Block(imageToVTK, cellData = {"temp" : np.ones((4, 4, 4))})})
+    s.save()
+
+    # Steps 1, 3 and 5 point at the file of the previous step
+    assert (s.written == 4 and s.skipped == 3)
+    assert not os.path.exists(FILE_PATH + "_1.vtu")
+    # The mesh of steps 2 and 4 was copied from its encoding in step 0
+    assert (s.arrayCache.reused > 0)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,75 @@
+#! /usr/bin/env python
+
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2021 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+# **************************************************************
+# * Example of how several processes, e.g. the ranks of a      *
+# * parallel simulation, add files to the same VTK group.      *
+# **************************************************************
+import multiprocessing
+import os
+import re
+import shutil
+from evtk.vtk import VtkSharedGroup
+
+FILE_PATH = "./shared_group"
+NPROCS = 4
+NSTEPS = 10
+def clean():
+    try:
+        os.remove(FILE_PATH + ".pvd")
+    except:
+        pass
+    shutil.rmtree(FILE_PATH + ".pvd.journals", ignore_errors = True)
+
+def worker(rank):
+    # Each process writes its own journal, without locks
+    g = VtkSharedGroup(FILE_PATH, part = rank)
+    for step in range(NSTEPS):
+        g.addFile(filepath = "sim%04d_%d.vtu" % (step, rank), sim_time = step / 10.0)
+    g.close()
+
+def run():
+    print("Running shared_group...")
+    clean()
+    processes = [multiprocessing.Process(target = worker, args = (rank,)) for rank in range(NPROCS)]
+    for p in processes: p.start()
+    for p in processes: p.join()
+    assert all(p.exitcode == 0 for p in processes)
+
+    # A process killed while it added an entry leaves an incomplete line, which is skipped
+    with open(os.path.join(FILE_PATH + ".pvd.journals", "part0.journal"), "a") as f:
+        f.write('<DataSet timestep="9.9" group="" part="0" fi')
+
+    # One process merges the journals once the others are done
+    VtkSharedGroup(FILE_PATH).save()
+    with open(FILE_PATH + ".pvd") as f:
+        entries = re.findall(r'timestep="([^"]*)" group="" part="([^"]*)" file="([^"]*)"', f.read())
+    assert (len(entries) == NPROCS * NSTEPS)
+    # Sorted by time, then by part
+    expected = [(str(step / 10.0), str(rank), "sim%04d_%d.vtu" % (step, rank)) for step in range(NSTEPS) for rank in range(NPROCS)]
+    assert (entries == expected)
+    assert not os.path.exists(FILE_PATH + ".pvd.journals")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,101 @@
+#! /usr/bin/env python
+
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2021 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+# **************************************************************
+# * Example of how to write fields that are read from a .npy   *
+# * file or produced chunk by chunk, instead of numpy arrays.  *
+# **************************************************************
+import os
+from evtk.hl import rectilinearToVTK
+from evtk.evtk import NpyFileSource, GeneratorSource
+from evtk.reader import VtkFileReader
+import numpy as np
+
+FILE_PATH = "./sources"
+def clean():
+    for name in ("npy", "generator", "vector", "ref", "vector_ref", "threads", "piece_0", "piece_1"):
+        try:
+            os.remove("%s_%s.vtr" % (FILE_PATH, name))
+        except:
+            pass
+    try:
+        os.remove(FILE_PATH + ".npy")
+    except:
+        pass
+
+def same(a, b):
+    with open(a, "rb") as fa, open(b, "rb") as fb:
+        return fa.read() == fb.read()
+
+def slabs(a):
+    # k-slabs of a 3D array, whose elements follow each other in Fortran order
+    return GeneratorSource(lambda: (a[:, :, k:k + 1] for k in range(a.shape[2])), a.shape, a.dtype)
+
+def run():
+    print("Running sources...")
+    nx, ny, nz = 20, 15, 10
+    pressure = np.random.rand(nx, ny, nz)
+    temp = np.random.rand(nx + 1, ny + 1, nz + 1)
+    vx, vy = np.random.rand(nx + 1, ny + 1, nz + 1), np.random.rand(nx + 1, ny + 1, nz + 1)
+    x = np.linspace(0.0, 1.0, nx + 1)
+    y = np.linspace(0.0, 1.0, ny + 1)
+    z = np.linspace(0.0, 1.0, nz + 1)
+    np.save(FILE_PATH + ".npy", pressure) # C order, read through a memory map
+    
+    for compressor in (None, True):
+        ref = rectilinearToVTK(FILE_PATH + "_ref", x, y, z, cellData = {"pressure" : pressure}, pointData = {"temp" : temp}, compressor = compressor)
+
+        # Small chunks, so the array is read in many pieces
+        npy = NpyFileSource(FILE_PATH + ".npy", buffer_size = 1024)
+        a = rectilinearToVTK(FILE_PATH + "_npy", x, y, z, cellData = {"pressure" : npy}, pointData = {"temp" : temp}, compressor = compressor)
+        assert same(a, ref)
+
+        a = rectilinearToVTK(FILE_PATH + "_generator", x, y, z, cellData = {"pressure" : slabs(pressure)}, 
+                             pointData = {"temp" : slabs(temp)}, compressor = compressor)
+        assert same(a, ref)
+
+        # Sources can be components of vectors, mixed with numpy arrays
+        ref = rectilinearToVTK(FILE_PATH + "_vector_ref", x, y, z, pointData = {"vel" : (vx, vy, temp)}, compressor = compressor)
+        a = rectilinearToVTK(FILE_PATH + "_vector", x, y, z, pointData = {"vel" : (slabs(vx), vy, slabs(temp))}, compressor = compressor)
+        assert same(a, ref)
+
+    # Uncompressed arrays written by several threads
+    ref = rectilinearToVTK(FILE_PATH + "_ref", x, y, z, cellData = {"pressure" : pressure}, pointData = {"vel" : (vx, vy, temp)})
+    a = rectilinearToVTK(FILE_PATH + "_threads", x, y, z, cellData = {"pressure" : NpyFileSource(FILE_PATH + ".npy")}, 
+                         pointData = {"vel" : (slabs(vx), vy, temp)}, nthreads = 2)
+    assert same(a, ref)
+
+    # Two pieces of a larger grid, e.g. written by two workers
+    half = nx // 2
+    for i, (i0, i1) in enumerate([(0, half), (half, nx)]):
+        path = rectilinearToVTK("%s_piece_%d" % (FILE_PATH, i), x[i0:i1 + 1], y, z, 
+                                cellData = {"pressure" : slabs(pressure[i0:i1])}, start = (i0, 0, 0), 
+                                wholeExtent = ((0, 0, 0), (nx, ny, nz)))
+        with VtkFileReader(path) as r:
+            assert (r.grid["WholeExtent"].split() == [str(e) for e in (0, nx, 0, ny, 0, nz)])
+            assert (r.pieces[0].extent() == [i0, i1, 0, ny, 0, nz])
+            assert np.array_equal(r.getArray("pressure"), pressure[i0:i1])
+
+if __name__ == "__main__":
+    run()
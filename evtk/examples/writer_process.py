@@ -0,0 +1,69 @@
+#! /usr/bin/env python
+
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2021 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+
+# **************************************************************
+# * Example of how to write files in a separate process, with  *
+# * arrays placed in shared memory.                            *
+# **************************************************************
+import os
+from evtk.service import WriterProcess
+from evtk.reader import VtkFileReader
+import numpy as np
+
+FILE_PATH = "./writer_process"
+NSTEPS = 4
+def clean():
+    for i in range(NSTEPS):
+        try:
+            os.remove("%s_%d.vti" % (FILE_PATH, i))
+        except:
+            pass
+    try:
+        os.remove(FILE_PATH + "_grid.vtr")
+    except:
+        pass
+
+def run():
+    print("Running writer_process...")
+    nx, ny, nz = 20, 20, 20
+
+    with WriterProcess(maxBlocks = 4) as w:
+        # The simulation works on an array in shared memory, which is not copied
+        p = w.array((nx, ny, nz))
+        last = None
+        for step in range(NSTEPS):
+            if last: w.wait(last) # the writer does not read p anymore
+            p.array[:] = step
+            last = w.submit("imageToVTK", "%s_%d" % (FILE_PATH, step), cellData = {"pressure" : p})
+        
+        # Numpy arrays are copied to shared memory
+        x = np.linspace(0.0, 1.0, nx + 1)
+        w.submit("rectilinearToVTK", FILE_PATH + "_grid", x, x, x, cellData = {"pressure" : np.ones((nx, ny, nz))})
+
+    for step in range(NSTEPS):
+        with VtkFileReader("%s_%d.vti" % (FILE_PATH, step)) as r:
+            assert np.all(r.getArray("pressure") == step)
+
+if __name__ == "__main__":
+    run()
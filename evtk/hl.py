@@ -28,6 +28,11 @@
 # **************************************
 
 from .vtk import * # VtkFile, VtkUnstructuredGrid, etc.
+from .evtk import _isArray, _toCompressor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+import os
+import threading
 try:
     import numpy as np
 except:
@@ -36,6 +41,16 @@ except:
 # =================================
 #       Helper functions
 # =================================
+def _extents(start, size, wholeExtent):
+    # Returns start and end indexes of a piece with size cells, and of the whole grid
+    if start is None: start = (0,0,0)
+    start = tuple(start)
+    end = (start[0] + size[0], start[1] + size[1], start[2] + size[2])
+    if wholeExtent is None: return start, end, start, end
+    wholeStart, wholeEnd = tuple(wholeExtent[0]), tuple(wholeExtent[1])
+    assert all(wholeStart[i] <= start[i] and end[i] <= wholeEnd[i] for i in range(3)), "Piece is outside of the whole extent."
+    return start, end, wholeStart, wholeEnd
+
 def _addDataToFile(vtkFile, cellData, pointData):
     # Point data
     if pointData:
@@ -72,7 +87,7 @@ def _appendDataToFile(vtkFile, cellData, pointData):
 def __convertListToArray(list1d):
     ''' If data is a list and no a Numpy array, then it convert it
         to an array, otherwise return the same array '''
-    if (list1d is not None) and (not type(list1d).__name__ == "ndarray"):
+    if (list1d is not None) and (not _isArray(list1d)):
         assert isinstance(list1d, (list, tuple))
         return np.array(list1d)
     else:
@@ -93,12 +108,12 @@ def __convertDictListToArrays(data):
 # =================================
 #       High level functions      
 # =================================
-def imageToVTK(path, origin = (0.0,0.0,0.0), spacing = (1.0,1.0,1.0), cellData = None, pointData = None, comments = None ):
+def imageToVTK(path, origin = (0.0,0.0,0.0), spacing = (1.0,1.0,1.0), cellData = None, pointData = None, comments = None, compressor = None, nthreads = 1, layout = None, arrayCache = None, start = None, wholeExtent = None):
     """ Exports data values as a rectangular image.
         
         PARAMETERS:
             path: name of the file without extension where data should be saved.
-            origin: grid origin (default = (0,0,0))
+            origin: grid origin, i.e. position of the point with indexes (0,0,0) (default = (0,0,0))
             spacing: grid spacing (default = (1,1,1))
             cellData: dictionary containing arrays with cell centered data.
                       Keys should be the names of the data arrays.
@@ -110,7 +125,19 @@ def imageToVTK(path, origin = (0.0,0.0,0.0), spacing = (1.0,1.0,1.0), cellData =
                       they should be equal to the dimensions of the cell data plus one and
                       must contain only scalar data.
             comments: list of comment strings, which will be added to the header section of the file.
+            compressor: None (default) to write uncompressed data, True or an integer level to compress
+                        data with zlib, a ZlibCompressor object, or "auto". See VtkFile.
+            nthreads: number of threads used to write uncompressed arrays in parallel. See VtkFile.
+            layout: VtkLayout that records the header of the file, or reuses the header recorded
+                    in a previous call with arrays of the same names, types and sizes. See VtkLayout.
+            arrayCache: ArrayCache that reuses the encoding of arrays that did not change since the
+                        previous file of a series. See VtkSeries.
          
+            start: indexes of the first point of this piece in the whole grid, e.g. the block owned
+                   by a worker of a domain-decomposed solver. Default (0,0,0).
+            wholeExtent: tuple (start, end) with the indexes of the first and last points of the
+                         whole grid. By default, the extent of this piece. Readers expect pieces 
+                         of a larger grid to be listed in a parallel file, see VtkParallelFile.
          RETURNS:
             Full path to saved file.
 
@@ -119,22 +146,21 @@ def imageToVTK(path, origin = (0.0,0.0,0.0), spacing = (1.0,1.0,1.0), cellData =
     assert (cellData != None or pointData != None)
     
     # Extract dimensions
-    start = (0,0,0)
-    end = None
     if cellData != None:
         keys = list(cellData.keys())
         data = cellData[keys[0]]
-        end = data.shape
+        size = data.shape
     elif pointData != None:
         keys = list(pointData.keys())
         data = pointData[keys[0]]
-        end = data.shape
-        end = (end[0] - 1, end[1] - 1, end[2] - 1)
+        size = data.shape
+        size = (size[0] - 1, size[1] - 1, size[2] - 1)
+    start, end, wholeStart, wholeEnd = _extents(start, size, wholeExtent)
 
     # Write data to file
-    w = VtkFile(path, VtkImageData)
+    w = VtkFile(path, VtkImageData, compressor = compressor, nthreads = nthreads, layout = layout, arrayCache = arrayCache)
     if comments: w.addComments(comments)
-    w.openGrid(start = start, end = end, origin = origin, spacing = spacing)
+    w.openGrid(start = wholeStart, end = wholeEnd, origin = origin, spacing = spacing)
     w.openPiece(start = start, end = end)
     _addDataToFile(w, cellData, pointData)
     w.closePiece()
@@ -144,7 +170,7 @@ def imageToVTK(path, origin = (0.0,0.0,0.0), spacing = (1.0,1.0,1.0), cellData =
     return w.getFileName()
 
 # ==============================================================================
-def rectilinearToVTK(path, x, y, z, cellData = None, pointData = None, comments = None):
+def rectilinearToVTK(path, x, y, z, cellData = None, pointData = None, comments = None, compressor = None, nthreads = 1, layout = None, arrayCache = None, start = None, wholeExtent = None):
     """
         Writes data values as a rectilinear or rectangular grid.
 
@@ -163,7 +189,19 @@ def rectilinearToVTK(path, x, y, z, cellData = None, pointData = None, comments
                        they should be equal to the dimensions of the cell data plus one and
                        must contain only scalar data.
             comments: list of comment strings, which will be added to the header section of the file.
+            compressor: None (default) to write uncompressed data, True or an integer level to compress
+                        data with zlib, a ZlibCompressor object, or "auto". See VtkFile.
+            nthreads: number of threads used to write uncompressed arrays in parallel. See VtkFile.
+            layout: VtkLayout that records the header of the file, or reuses the header recorded
+                    in a previous call with arrays of the same names, types and sizes. See VtkLayout.
+            arrayCache: ArrayCache that reuses the encoding of arrays that did not change since the
+                        previous file of a series. See VtkSeries.
             
+            start: indexes of the first point of this piece in the whole grid, e.g. the block owned
+                   by a worker of a domain-decomposed solver. Default (0,0,0).
+            wholeExtent: tuple (start, end) with the indexes of the first and last points of the
+                         whole grid. By default, the extent of this piece. Readers expect pieces 
+                         of a larger grid to be listed in a parallel file, see VtkParallelFile.
         RETURNS:
             Full path to saved file.
 
@@ -172,12 +210,11 @@ def rectilinearToVTK(path, x, y, z, cellData = None, pointData = None, comments
     ftype = VtkRectilinearGrid
     nx, ny, nz = x.size - 1, y.size - 1, z.size - 1
     # Extract dimensions
-    start = (0,0,0)
-    end   = (nx, ny, nz)
+    start, end, wholeStart, wholeEnd = _extents(start, (nx, ny, nz), wholeExtent)
     
-    w =  VtkFile(path, ftype)
+    w =  VtkFile(path, ftype, compressor = compressor, nthreads = nthreads, layout = layout, arrayCache = arrayCache)
     if comments: w.addComments(comments)
-    w.openGrid(start = start, end = end)
+    w.openGrid(start = wholeStart, end = wholeEnd)
     w.openPiece(start = start, end = end)
 
     w.openElement("Coordinates")
@@ -197,7 +234,7 @@ def rectilinearToVTK(path, x, y, z, cellData = None, pointData = None, comments
     return w.getFileName()
     
 
-def structuredToVTK(path, x, y, z, cellData = None, pointData = None, comments = None):
+def structuredToVTK(path, x, y, z, cellData = None, pointData = None, comments = None, compressor = None, nthreads = 1, layout = None, arrayCache = None, start = None, wholeExtent = None):
     """
         Writes data values as a rectilinear or rectangular grid.
 
@@ -216,7 +253,19 @@ def structuredToVTK(path, x, y, z, cellData = None, pointData = None, comments =
                        they should be equal to the dimensions of the cell data plus one and
                        must contain only scalar data.
             comments: list of comment strings, which will be added to the header section of the file.
+            compressor: None (default) to write uncompressed data, True or an integer level to compress
+                        data with zlib, a ZlibCompressor object, or "auto". See VtkFile.
+            nthreads: number of threads used to write uncompressed arrays in parallel. See VtkFile.
+            layout: VtkLayout that records the header of the file, or reuses the header recorded
+                    in a previous call with arrays of the same names, types and sizes. See VtkLayout.
+            arrayCache: ArrayCache that reuses the encoding of arrays that did not change since the
+                        previous file of a series. See VtkSeries.
             
+            start: indexes of the first point of this piece in the whole grid, e.g. the block owned
+                   by a worker of a domain-decomposed solver. Default (0,0,0).
+            wholeExtent: tuple (start, end) with the indexes of the first and last points of the
+                         whole grid. By default, the extent of this piece. Readers expect pieces 
+                         of a larger grid to be listed in a parallel file, see VtkParallelFile.
         RETURNS:
             Full path to saved file.
 
@@ -226,12 +275,11 @@ def structuredToVTK(path, x, y, z, cellData = None, pointData = None, comments =
     ftype = VtkStructuredGrid
     s = x.shape
     nx, ny, nz = s[0] - 1, s[1] - 1, s[2] - 1
-    start = (0,0,0)
-    end = (nx, ny, nz)
+    start, end, wholeStart, wholeEnd = _extents(start, (nx, ny, nz), wholeExtent)
  
-    w =  VtkFile(path, ftype)
+    w =  VtkFile(path, ftype, compressor = compressor, nthreads = nthreads, layout = layout, arrayCache = arrayCache)
     if comments: w.addComments(comments)
-    w.openGrid(start = start, end = end)
+    w.openGrid(start = wholeStart, end = wholeEnd)
     w.openPiece(start = start, end = end)
     w.openElement("Points")
     w.addData("points", (x,y,z))
@@ -321,7 +369,7 @@ def structuredToVTK(path, x, y, z, cellData = None, pointData = None, comments =
 
 
 # ==============================================================================
-def pointsToVTK(path, x, y, z, data = None, comments = None ):
+def pointsToVTK(path, x, y, z, data = None, comments = None, compressor = None, nthreads = 1, layout = None, arrayCache = None):
     """
         Export points and associated data as an unstructured grid.
 
@@ -332,6 +380,13 @@ def pointsToVTK(path, x, y, z, data = None, comments = None ):
                   Keys should be the names of the variable stored in each array.
                   All 1D list-type object (list, tuple or numpy) must have the same number of elements.
             comments: list of comment strings, which will be added to the header section of the file.
+            compressor: None (default) to write uncompressed data, True or an integer level to compress
+                        data with zlib, a ZlibCompressor object, or "auto". See VtkFile.
+            nthreads: number of threads used to write uncompressed arrays in parallel. See VtkFile.
+            layout: VtkLayout that records the header of the file, or reuses the header recorded
+                    in a previous call with arrays of the same names, types and sizes. See VtkLayout.
+            arrayCache: ArrayCache that reuses the encoding of arrays that did not change since the
+                        previous file of a series. See VtkSeries.
             
         RETURNS:
             Full path to saved file.
@@ -352,7 +407,7 @@ def pointsToVTK(path, x, y, z, data = None, comments = None ):
    
     cell_types[:] = VtkVertex.tid
 
-    w = VtkFile(path, VtkUnstructuredGrid)
+    w = VtkFile(path, VtkUnstructuredGrid, compressor = compressor, nthreads = nthreads, layout = layout, arrayCache = arrayCache)
     if comments: w.addComments(comments)
     w.openGrid()
     w.openPiece(ncells = npoints, npoints = npoints)
@@ -379,7 +434,7 @@ def pointsToVTK(path, x, y, z, data = None, comments = None ):
     return w.getFileName()
     
 # ==============================================================================
-def pointsToVTKAsTIN(path, x, y, z, data = None, comments = None, ndim = 2):
+def pointsToVTKAsTIN(path, x, y, z, data = None, comments = None, ndim = 2, compressor = None, nthreads = 1, layout = None, arrayCache = None):
     """
         Export points and associated data as a triangula irregular grid.
         It builds a triangular grid that has the input points as nodes
@@ -394,6 +449,13 @@ def pointsToVTKAsTIN(path, x, y, z, data = None, comments = None, ndim = 2):
                   Keys should be the names of the variable stored in each array.
                   All 1D list-type object (list, tuple or numpy) must have the same number of elements.
             comments: list of comment strings, which will be added to the header section of the file.
+            compressor: None (default) to write uncompressed data, True or an integer level to compress
+                        data with zlib, a ZlibCompressor object, or "auto". See VtkFile.
+            nthreads: number of threads used to write uncompressed arrays in parallel. See VtkFile.
+            layout: VtkLayout that records the header of the file, or reuses the header recorded
+                    in a previous call with arrays of the same names, types and sizes. See VtkLayout.
+            arrayCache: ArrayCache that reuses the encoding of arrays that did not change since the
+                        previous file of a series. See VtkSeries.
             ndim: is the number of dimensions considered when calling Delaunay.
                   If ndim = 2, then only coordinates x and y are passed.
                   If ndim = 3, then x, y and z coordinates are passed.
@@ -441,10 +503,10 @@ def pointsToVTKAsTIN(path, x, y, z, data = None, comments = None, ndim = 2):
     cell_type = np.ones(ncells) * VtkTriangle.tid
     
     if not data: data = {"Elevation" : z}
-    unstructuredGridToVTK(path, x, y, z, connectivity = conn, offsets = offset, cell_types = cell_type, cellData = None, pointData = data, comments = None)
+    return unstructuredGridToVTK(path, x, y, z, connectivity = conn, offsets = offset, cell_types = cell_type, cellData = None, pointData = data, comments = None, compressor = compressor, nthreads = nthreads, layout = layout, arrayCache = arrayCache)
         
 # ==============================================================================
-def linesToVTK(path, x, y, z, cellData = None, pointData = None, comments = None ):
+def linesToVTK(path, x, y, z, cellData = None, pointData = None, comments = None, compressor = None, nthreads = 1, layout = None, arrayCache = None):
     """
         Export line segments that joint 2 points and associated data.
 
@@ -459,6 +521,13 @@ def linesToVTK(path, x, y, z, cellData = None, pointData = None, comments = None
                   Keys should be the names of the variable stored in each array.
                   All 1D list-type object (list, tuple or numpy) must have the same number of elements.
             comments: list of comment strings, which will be added to the header section of the file.
+            compressor: None (default) to write uncompressed data, True or an integer level to compress
+                        data with zlib, a ZlibCompressor object, or "auto". See VtkFile.
+            nthreads: number of threads used to write uncompressed arrays in parallel. See VtkFile.
+            layout: VtkLayout that records the header of the file, or reuses the header recorded
+                    in a previous call with arrays of the same names, types and sizes. See VtkLayout.
+            arrayCache: ArrayCache that reuses the encoding of arrays that did not change since the
+                        previous file of a series. See VtkSeries.
                   
         RETURNS:
             Full path to saved file.
@@ -485,7 +554,7 @@ def linesToVTK(path, x, y, z, cellData = None, pointData = None, comments = None
    
     cell_types[:] = VtkLine.tid
 
-    w = VtkFile(path, VtkUnstructuredGrid)
+    w = VtkFile(path, VtkUnstructuredGrid, compressor = compressor, nthreads = nthreads, layout = layout, arrayCache = arrayCache)
     if comments: w.addComments(comments)
     w.openGrid()
     w.openPiece(ncells = ncells, npoints = npoints)
@@ -512,7 +581,7 @@ def linesToVTK(path, x, y, z, cellData = None, pointData = None, comments = None
     return w.getFileName()
 
 # ==============================================================================
-def polyLinesToVTK(path, x, y, z, pointsPerLine, cellData = None, pointData = None, comments = None ):
+def polyLinesToVTK(path, x, y, z, pointsPerLine, cellData = None, pointData = None, comments = None, compressor = None, nthreads = 1, layout = None, arrayCache = None):
     """
         Export line segments that joint 2 points and associated data.
 
@@ -531,6 +600,13 @@ def polyLinesToVTK(path, x, y, z, pointsPerLine, cellData = None, pointData = No
                        Keys should be the names of the variable stored in each array.
                        1D list-type object (list, tuple or numpy) must have the same number of elements.
             comments: list of comment strings, which will be added to the header section of the file.
+            compressor: None (default) to write uncompressed data, True or an integer level to compress
+                        data with zlib, a ZlibCompressor object, or "auto". See VtkFile.
+            nthreads: number of threads used to write uncompressed arrays in parallel. See VtkFile.
+            layout: VtkLayout that records the header of the file, or reuses the header recorded
+                    in a previous call with arrays of the same names, types and sizes. See VtkLayout.
+            arrayCache: ArrayCache that reuses the encoding of arrays that did not change since the
+                        previous file of a series. See VtkSeries.
             
         RETURNS:
             Full path to saved file.
@@ -559,7 +635,7 @@ def polyLinesToVTK(path, x, y, z, pointsPerLine, cellData = None, pointData = No
     cell_types = np.empty(npoints, dtype = 'uint8') 
     cell_types[:] = VtkPolyLine.tid
 
-    w = VtkFile(path, VtkUnstructuredGrid)
+    w = VtkFile(path, VtkUnstructuredGrid, compressor = compressor, nthreads = nthreads, layout = layout, arrayCache = arrayCache)
     if comments: w.addComments(comments)
     w.openGrid()
     w.openPiece(ncells = ncells, npoints = npoints)
@@ -586,7 +662,7 @@ def polyLinesToVTK(path, x, y, z, pointsPerLine, cellData = None, pointData = No
     return w.getFileName()
 
 # ==============================================================================
-def unstructuredGridToVTK(path, x, y, z, connectivity, offsets, cell_types, cellData = None, pointData = None, comments = None ):
+def unstructuredGridToVTK(path, x, y, z, connectivity, offsets, cell_types, cellData = None, pointData = None, comments = None, compressor = None, nthreads = 1, layout = None, arrayCache = None):
     """
         Export unstructured grid and associated data.
 
@@ -609,6 +685,13 @@ def unstructuredGridToVTK(path, x, y, z, connectivity, offsets, cell_types, cell
                        Keys should be the names of the variable stored in each array.
                        All 1D list-type object (list, tuple or numpy) must have the same number of elements.
             comments: list of comment strings, which will be added to the header section of the file.
+            compressor: None (default) to write uncompressed data, True or an integer level to compress
+                        data with zlib, a ZlibCompressor object, or "auto". See VtkFile.
+            nthreads: number of threads used to write uncompressed arrays in parallel. See VtkFile.
+            layout: VtkLayout that records the header of the file, or reuses the header recorded
+                    in a previous call with arrays of the same names, types and sizes. See VtkLayout.
+            arrayCache: ArrayCache that reuses the encoding of arrays that did not change since the
+                        previous file of a series. See VtkSeries.
             
         RETURNS:
             Full path to saved file.
@@ -628,7 +711,7 @@ def unstructuredGridToVTK(path, x, y, z, connectivity, offsets, cell_types, cell
     ncells = cell_types.size
     assert (offsets.size == ncells)
     
-    w = VtkFile(path, VtkUnstructuredGrid)
+    w = VtkFile(path, VtkUnstructuredGrid, compressor = compressor, nthreads = nthreads, layout = layout, arrayCache = arrayCache)
     if comments: w.addComments(comments)
     w.openGrid()
     w.openPiece(ncells = ncells, npoints = npoints)
@@ -655,7 +738,241 @@ def unstructuredGridToVTK(path, x, y, z, connectivity, offsets, cell_types, cell
     return w.getFileName()
     
 # ==============================================================================
-def cylinderToVTK(path, x0, y0, z0, z1, radius, nlayers, npilars = 16, cellData=None, pointData=None, comments = None ):
+def _piecePoints(piece):
+    # Converts coordinates and data of a piece to arrays
+    piece = dict(piece)
+    for key in ("x", "y", "z", "connectivity", "offsets", "cell_types"):
+        if key in piece: piece[key] = __convertListToArray(piece[key])
+    for key in ("verts", "lines", "strips", "polys"):
+        if piece.get(key) is not None: piece[key] = tuple(__convertListToArray(a) for a in piece[key])
+    piece["cellData"] = __convertDictListToArrays(piece.get("cellData"))
+    piece["pointData"] = __convertDictListToArrays(piece.get("pointData"))
+    assert (piece["x"].size == piece["y"].size == piece["z"].size)
+    return piece
+
+def unstructuredGridPiecesToVTK(path, pieces, comments = None, compressor = None, nthreads = 1, layout = None, arrayCache = None):
+    """
+        Export an unstructured grid made of several pieces to a single file, e.g. the blocks
+        of a partitioned mesh, without concatenating their arrays. Each piece is stored in its
+        own Piece element, and readers merge them.
+
+        PARAMETERS:
+            path: name of the file without extension where data should be saved.
+            pieces: list of dictionaries with the arguments of unstructuredGridToVTK for each piece,
+                    i.e. x, y, z, connectivity, offsets, cell_types and optionally cellData and pointData.
+                    Connectivity is numbered from the first point of the piece.
+                    All pieces must have the same data arrays. Arrays can be array sources.
+            comments: list of comment strings, which will be added to the header section of the file.
+            compressor: None (default) to write uncompressed data, True or an integer level to compress
+                        data with zlib, a ZlibCompressor object, or "auto". See VtkFile.
+            nthreads: number of threads used to write uncompressed arrays in parallel. See VtkFile.
+            layout: VtkLayout that records the header of the file, or reuses the header recorded
+                    in a previous call with arrays of the same names, types and sizes. See VtkLayout.
+            arrayCache: ArrayCache that reuses the encoding of arrays that did not change since the
+                        previous file of a series. See VtkSeries.
+            
+        RETURNS:
+            Full path to saved file.
+    """
+    pieces = [_piecePoints(p) for p in pieces]
+    
+    w = VtkFile(path, VtkUnstructuredGrid, compressor = compressor, nthreads = nthreads, layout = layout, arrayCache = arrayCache)
+    if comments: w.addComments(comments)
+    w.openGrid()
+    for p in pieces:
+        assert (p["offsets"].size == p["cell_types"].size)
+        w.openPiece(ncells = p["cell_types"].size, npoints = p["x"].size)
+        w.openElement("Points")
+        w.addData("points", (p["x"], p["y"], p["z"]))
+        w.closeElement("Points")
+        w.openElement("Cells")
+        w.addData("connectivity", p["connectivity"])
+        w.addData("offsets", p["offsets"])
+        w.addData("types", p["cell_types"])
+        w.closeElement("Cells")
+        _addDataToFile(w, cellData = p["cellData"], pointData = p["pointData"])
+        w.closePiece()
+    w.closeGrid()
+
+    for p in pieces:
+        w.appendData( (p["x"], p["y"], p["z"]) )
+        w.appendData(p["connectivity"]).appendData(p["offsets"]).appendData(p["cell_types"])
+        _appendDataToFile(w, cellData = p["cellData"], pointData = p["pointData"])
+
+    w.save()
+    return w.getFileName()
+
+_poly_cells = ( ("Verts", "verts"), ("Lines", "lines"), ("Strips", "strips"), ("Polys", "polys") )
+
+def polyDataPiecesToVTK(path, pieces, comments = None, compressor = None, nthreads = 1, layout = None, arrayCache = None):
+    """
+        Export polygonal data made of several pieces to a single .vtp file, e.g. the patches
+        of a boundary surface, without concatenating their arrays. Each piece is stored in
+        its own Piece element, and readers merge them.
+
+        PARAMETERS:
+            path: name of the file without extension where data should be saved.
+            pieces: list of dictionaries, one for each piece, with:
+                    x, y, z: 1D arrays with coordinates of the points of the piece.
+                    verts, lines, strips, polys: optional tuples (connectivity, offsets) that
+                        describe each kind of cells, as in unstructuredGridToVTK.
+                        Connectivity is numbered from the first point of the piece.
+                    cellData, pointData: optional dictionaries with data of the cells and points.
+                        Cells are ordered as verts, lines, strips and polys.
+                    All pieces must have the same data arrays. Arrays can be array sources.
+            comments, compressor, nthreads, layout, arrayCache: see unstructuredGridPiecesToVTK.
+            
+        RETURNS:
+            Full path to saved file.
+    """
+    pieces = [_piecePoints(p) for p in pieces]
+    
+    w = VtkFile(path, VtkPolyData, compressor = compressor, nthreads = nthreads, layout = layout, arrayCache = arrayCache)
+    if comments: w.addComments(comments)
+    w.openGrid()
+    for p in pieces:
+        ncells = [p[key][1].size if p.get(key) is not None else 0 for tag, key in _poly_cells]
+        w.openPiece(npoints = p["x"].size, nverts = ncells[0], nlines = ncells[1], nstrips = ncells[2], npolys = ncells[3])
+        w.openElement("Points")
+        w.addData("points", (p["x"], p["y"], p["z"]))
+        w.closeElement("Points")
+        for tag, key in _poly_cells:
+            if p.get(key) is not None:
+                w.openElement(tag)
+                w.addData("connectivity", p[key][0])
+                w.addData("offsets", p[key][1])
+                w.closeElement(tag)
+        _addDataToFile(w, cellData = p["cellData"], pointData = p["pointData"])
+        w.closePiece()
+    w.closeGrid()
+
+    for p in pieces:
+        w.appendData( (p["x"], p["y"], p["z"]) )
+        for tag, key in _poly_cells:
+            if p.get(key) is not None:
+                w.appendData(p[key][0]).appendData(p[key][1])
+        _appendDataToFile(w, cellData = p["cellData"], pointData = p["pointData"])
+
+    w.save()
+    return w.getFileName()
+
+# ==============================================================================
+class StaticGeometry:
+    """ Points and cells of an unstructured grid that do not change between the files of a
+        time series. Arrays are encoded (and compressed) once, when the geometry is created,
+        and their bytes are copied to each file written with staticGeometryToVTK.
+    """
+    def __init__(self, x, y, z, connectivity, offsets, cell_types, compressor = None, cachePath = None):
+        """
+            PARAMETERS:
+                x, y, z, connectivity, offsets, cell_types: see unstructuredGridToVTK.
+                compressor: compressor used to encode the arrays. Files written with this geometry
+                            use the same compressor. See VtkFile.
+                cachePath: path of a file where encoded arrays are stored, instead of keeping them
+                           in memory. They are copied from it with os.copy_file_range if possible.
+            
+            NOTE: arrays must be numpy arrays or array sources. Use unstructuredGeometry to pass lists.
+        """
+        assert (x.size == y.size == z.size)
+        assert (offsets.size == cell_types.size)
+
+        self.npoints = x.size
+        self.ncells = cell_types.size
+        self.compressor = _toCompressor(compressor)
+        self.cacheFile = open(cachePath, "w+b") if cachePath else None
+        self.points = EncodedArray( (x,y,z), self.compressor, self.cacheFile )
+        self.connectivity = EncodedArray(connectivity, self.compressor, self.cacheFile)
+        self.offsets = EncodedArray(offsets, self.compressor, self.cacheFile)
+        self.cell_types = EncodedArray(cell_types, self.compressor, self.cacheFile)
+
+    def close(self):
+        """ Closes cache file, if any. """
+        if self.cacheFile:
+            self.cacheFile.close()
+            self.cacheFile = None
+
+def unstructuredGeometry(x, y, z, connectivity, offsets, cell_types, compressor = None, cachePath = None):
+    """ Creates the StaticGeometry of an unstructured grid, as exported by unstructuredGridToVTK.
+        Arrays can be lists or tuples. See StaticGeometry for parameters.
+    """
+    x = __convertListToArray(x)
+    y = __convertListToArray(y)
+    z = __convertListToArray(z)
+    connectivity = __convertListToArray(connectivity)
+    offsets = __convertListToArray(offsets)
+    cell_types = __convertListToArray(cell_types)
+    return StaticGeometry(x, y, z, connectivity, offsets, cell_types, compressor = compressor, cachePath = cachePath)
+
+def pointsGeometry(x, y, z, compressor = None, cachePath = None):
+    """ Creates the StaticGeometry of a set of points, as exported by pointsToVTK. 
+        See StaticGeometry for parameters.
+    """
+    x = __convertListToArray(x)
+    y = __convertListToArray(y)
+    z = __convertListToArray(z)
+    npoints = len(x)
+    offsets = np.arange(start = 1, stop = npoints + 1, dtype = 'int32')   # index of last node in each cell
+    connectivity = np.arange(npoints, dtype = 'int32')                    # each point is only connected to itself
+    cell_types = np.empty(npoints, dtype = 'uint8') 
+    cell_types[:] = VtkVertex.tid
+    return StaticGeometry(x, y, z, connectivity, offsets, cell_types, compressor = compressor, cachePath = cachePath)
+
+def staticGeometryToVTK(path, geometry, cellData = None, pointData = None, comments = None, nthreads = 1, layout = None, arrayCache = None):
+    """
+        Export data associated to a static unstructured grid. Only data arrays are encoded,
+        the geometry is copied from its encoded arrays.
+
+        PARAMETERS:
+            path: name of the file without extension where data should be saved.
+            geometry: StaticGeometry, e.g. created with pointsGeometry.
+            cellData: Dictionary with variables associated to each cell.
+                      Keys should be the names of the variable stored in each array.
+                      All 1D list-type object (list, tuple or numpy) must have the same number of elements.        
+            pointData: Dictionary with variables associated to each vertex.
+                       Keys should be the names of the variable stored in each array.
+                       All 1D list-type object (list, tuple or numpy) must have the same number of elements.
+            comments: list of comment strings, which will be added to the header section of the file.
+            nthreads: number of threads used to write uncompressed arrays in parallel. See VtkFile.
+            layout: VtkLayout that records the header of the file, or reuses the header recorded
+                    in a previous call with arrays of the same names, types and sizes. See VtkLayout.
+            arrayCache: ArrayCache that reuses the encoding of arrays that did not change since the
+                        previous file of a series. See VtkSeries.
+            
+        RETURNS:
+            Full path to saved file.
+
+    """
+    cellData = __convertDictListToArrays(cellData)
+    pointData = __convertDictListToArrays(pointData)
+
+    w = VtkFile(path, VtkUnstructuredGrid, compressor = geometry.compressor, nthreads = nthreads, layout = layout, arrayCache = arrayCache)
+    if comments: w.addComments(comments)
+    w.openGrid()
+    w.openPiece(ncells = geometry.ncells, npoints = geometry.npoints)
+    
+    w.openElement("Points")
+    w.addData("points", geometry.points)
+    w.closeElement("Points")
+    w.openElement("Cells")
+    w.addData("connectivity", geometry.connectivity)
+    w.addData("offsets", geometry.offsets)
+    w.addData("types", geometry.cell_types)
+    w.closeElement("Cells")
+    
+    _addDataToFile(w, cellData = cellData, pointData = pointData)
+
+    w.closePiece()
+    w.closeGrid()
+    w.appendData(geometry.points)
+    w.appendData(geometry.connectivity).appendData(geometry.offsets).appendData(geometry.cell_types)
+
+    _appendDataToFile(w, cellData = cellData, pointData = pointData)
+
+    w.save()
+    return w.getFileName()
+
+# ==============================================================================
+def cylinderToVTK(path, x0, y0, z0, z1, radius, nlayers, npilars = 16, cellData=None, pointData=None, comments = None, compressor = None, nthreads = 1, layout = None, arrayCache = None):
     """
         Export cylinder as VTK unstructured grid.
     
@@ -672,6 +989,13 @@ def cylinderToVTK(path, x0, y0, z0, z1, radius, nlayers, npilars = 16, cellData=
         pointData: dictionary with 1D arrays that store point data.
                   Arrays should have number of elements equal to npoints = npilars * (nlayers + 1).
         comments: list of comment strings, which will be added to the header section of the file.
+        compressor: None (default) to write uncompressed data, True or an integer level to compress
+                    data with zlib, a ZlibCompressor object, or "auto". See VtkFile.
+        nthreads: number of threads used to write uncompressed arrays in parallel. See VtkFile.
+        layout: VtkLayout that records the header of the file, or reuses the header recorded
+                in a previous call with arrays of the same names, types and sizes. See VtkLayout.
+        arrayCache: ArrayCache that reuses the encoding of arrays that did not change since the
+                    previous file of a series. See VtkSeries.
                     
       RETURNS: 
             Full path to saved file.
@@ -736,4 +1060,399 @@ def cylinderToVTK(path, x0, y0, z0, z1, radius, nlayers, npilars = 16, cellData=
     # Define cell types
     ctype = np.ones(ncells) + VtkPixel.tid
     
-    return unstructuredGridToVTK(path, xx, yy, zz, connectivity = conn, offsets = offsets, cell_types = ctype, cellData = cellData, pointData = pointData, comments = comments)
+    return unstructuredGridToVTK(path, xx, yy, zz, connectivity = conn, offsets = offsets, cell_types = ctype, cellData = cellData, pointData = pointData, comments = comments, compressor = compressor, nthreads = nthreads, layout = layout, arrayCache = arrayCache)
+
+# ==============================================================================
+#                             Parallel files
+# ==============================================================================
+def partitionExtent(end, npieces):
+    """ Splits a structured grid into pieces, halving the longest side of the largest piece
+        until there are npieces. Neighbor pieces share the points of their common face.
+
+        PARAMETERS:
+            end: number of cells of the grid in each direction.
+            npieces: number of pieces. There are less pieces if the grid has less cells.
+
+        RETURNS:
+            list of (start, end) tuples with the extents of the pieces, sorted by their start index.
+    """
+    pieces = [((0,0,0), tuple(end))]
+    while len(pieces) < npieces:
+        sizes = [(e[0] - s[0]) * (e[1] - s[1]) * (e[2] - s[2]) for s, e in pieces]
+        i = sizes.index(max(sizes))
+        s, e = pieces[i]
+        axis = max(range(3), key = lambda a: e[a] - s[a])
+        if e[axis] - s[axis] < 2: break # all pieces have a single cell
+        mid = (s[axis] + e[axis]) // 2
+        e0, s1 = list(e), list(s)
+        e0[axis], s1[axis] = mid, mid
+        pieces[i:i+1] = [(s, tuple(e0)), (tuple(s1), e)]
+    return sorted(pieces, key = lambda p: p[0][::-1])
+
+def _slicePiece(data, start, end, extra):
+    # Returns a view of the part of a 3D array, a tuple or a dictionary of arrays that belongs
+    # to a piece. extra is 1 for point data, which has one more element than cells.
+    if data is None:
+        return None
+    elif isinstance(data, dict):
+        return {k : _slicePiece(v, start, end, extra) for k, v in data.items()}
+    elif type(data).__name__ == "tuple":
+        return tuple(_slicePiece(d, start, end, extra) for d in data)
+    return data[start[0]:end[0] + extra, start[1]:end[1] + extra, start[2]:end[2] + extra]
+
+def _fortranPiece(data):
+    # Copies the views of a piece that are not contiguous, so they can be written
+    if data is None:
+        return None
+    elif isinstance(data, dict):
+        return {k : _fortranPiece(v) for k, v in data.items()}
+    elif type(data).__name__ == "tuple":
+        return tuple(_fortranPiece(d) for d in data)
+    return np.asfortranarray(data)
+
+def _structuredPiece(path, ftype, start, origin, spacing, coords, cellData, pointData, compressor):
+    # Writes a piece of a structured grid, with its extent in the whole grid
+    coords, cellData, pointData = _fortranPiece(coords), _fortranPiece(cellData), _fortranPiece(pointData)
+    if ftype == VtkImageData:
+        return imageToVTK(path, origin, spacing, cellData, pointData, compressor = compressor, start = start)
+    elif ftype == VtkRectilinearGrid:
+        return rectilinearToVTK(path, coords[0], coords[1], coords[2], cellData, pointData, compressor = compressor, start = start)
+    else:
+        return structuredToVTK(path, coords[0], coords[1], coords[2], cellData, pointData, compressor = compressor, start = start)
+
+def _unstructuredPiece(path, piece, compressor):
+    return unstructuredGridToVTK(path, compressor = compressor, **piece)
+
+_forkedTasks = None # tasks of the pool of this process, set by its initializer
+
+def _setTasks(tasks):
+    # Initializer of forked processes. Arguments of forked processes are inherited, not pickled.
+    global _forkedTasks
+    _forkedTasks = tasks
+
+def _writeForkedPiece(i):
+    task = _forkedTasks[i]
+    return task[0](*task[1:])
+
+def _writeTask(task):
+    return task[0](*task[1:])
+
+def _writePieces(tasks, nprocs):
+    # Runs tasks (function, arguments...) in a process pool and returns their results in order.
+    # Forked processes inherit the arrays of the pieces, other processes receive copies of them.
+    # Processes are not forked if this process runs other threads, which could hold locks
+    # that would never be released in the forked process. Pieces are written by threads then.
+    if nprocs is None: nprocs = os.cpu_count() or 1
+    nprocs = min(nprocs, len(tasks))
+    if nprocs <= 1:
+        return [_writeTask(t) for t in tasks]
+    if "fork" in multiprocessing.get_all_start_methods():
+        if threading.active_count() > 1:
+            with ThreadPoolExecutor(nprocs) as pool:
+                return list(pool.map(_writeTask, tasks))
+        with ProcessPoolExecutor(nprocs, mp_context = multiprocessing.get_context("fork"),
+                                 initializer = _setTasks, initargs = (tasks,)) as pool:
+            return list(pool.map(_writeForkedPiece, range(len(tasks))))
+    with ProcessPoolExecutor(nprocs) as pool:
+        return list(pool.map(_writeTask, tasks))
+
+def _parallelStructuredToVTK(path, ftype, ptype, end, npieces, origin, spacing, coords, cellData, pointData, comments, compressor, nprocs):
+    pieces = partitionExtent(end, npieces)
+    tasks = []
+    for i, (s, e) in enumerate(pieces):
+        if ftype == VtkRectilinearGrid:
+            pcoords = tuple(c[s[a]:e[a] + 1] for a, c in enumerate(coords))
+        else:
+            pcoords = _slicePiece(coords, s, e, 1)
+        tasks.append( (_structuredPiece, "%s_%d" % (path, i), ftype, s, origin, spacing, pcoords,
+                       _slicePiece(cellData, s, e, 0), _slicePiece(pointData, s, e, 1), compressor) )
+    files = _writePieces(tasks, nprocs)
+
+    w = VtkParallelFile(path, ptype)
+    if comments: w.addComments(comments)
+    w.openGrid(start = (0,0,0), end = end, origin = origin, spacing = spacing)
+    _addDataToFile(w, cellData, pointData)
+    if ftype == VtkRectilinearGrid:
+        w.openElement("PCoordinates")
+        w.addData("x_coordinates", coords[0])
+        w.addData("y_coordinates", coords[1])
+        w.addData("z_coordinates", coords[2])
+        w.closeElement("PCoordinates")
+    elif ftype == VtkStructuredGrid:
+        w.openElement("PPoints")
+        w.addData("points", coords)
+        w.closeElement("PPoints")
+    for f, (s, e) in zip(files, pieces):
+        w.addPiece(f, start = s, end = e)
+    w.closeGrid()
+    w.save()
+    return w.getFileName()
+
+def parallelImageToVTK(path, npieces, origin = (0.0,0.0,0.0), spacing = (1.0,1.0,1.0), cellData = None, pointData = None, comments = None, compressor = None, nprocs = None):
+    """ Exports data values as a rectangular image split in pieces, which are written by
+        a pool of processes. Each piece is stored in a .vti file and a .pvti file lists them.
+
+        PARAMETERS:
+            path: name of the file without extension where data should be saved.
+                  Pieces are stored in files named path_0.vti, path_1.vti, etc.
+            npieces: number of pieces. See partitionExtent.
+            origin, spacing, cellData, pointData: see imageToVTK. Arrays must be numpy arrays.
+            comments: list of comment strings, which will be added to the header section of the .pvti file.
+            compressor: None (default) to write uncompressed data, True or an integer level to compress
+                        data with zlib, a ZlibCompressor object, or "auto". See VtkFile.
+            nprocs: number of processes that write the pieces. By default, the number of CPUs.
+                    Pieces are written by this process if it is 1, and by threads if this 
+                    process is running other threads (e.g. those of a ZlibCompressor).
+
+        RETURNS:
+            Full path to saved .pvti file.
+    """
+    assert (cellData != None or pointData != None)
+    if cellData != None:
+        end = list(cellData.values())[0].shape
+    else:
+        end = list(pointData.values())[0].shape
+        end = (end[0] - 1, end[1] - 1, end[2] - 1)
+    return _parallelStructuredToVTK(path, VtkImageData, VtkPImageData, end, npieces, origin, spacing, None,
+                                    cellData, pointData, comments, compressor, nprocs)
+
+def parallelRectilinearToVTK(path, npieces, x, y, z, cellData = None, pointData = None, comments = None, compressor = None, nprocs = None):
+    """ Writes data values as a rectilinear grid split in pieces, which are written by
+        a pool of processes. Each piece is stored in a .vtr file and a .pvtr file lists them.
+
+        PARAMETERS:
+            path: name of the file without extension where data should be saved.
+                  Pieces are stored in files named path_0.vtr, path_1.vtr, etc.
+            npieces: number of pieces. See partitionExtent.
+            x, y, z, cellData, pointData: see rectilinearToVTK. Arrays must be numpy arrays.
+            comments, compressor, nprocs: see parallelImageToVTK.
+
+        RETURNS:
+            Full path to saved .pvtr file.
+    """
+    assert (x.ndim == 1 and y.ndim == 1 and z.ndim == 1), "Wrong array dimension"
+    end = (x.size - 1, y.size - 1, z.size - 1)
+    return _parallelStructuredToVTK(path, VtkRectilinearGrid, VtkPRectilinearGrid, end, npieces, None, None, (x, y, z),
+                                    cellData, pointData, comments, compressor, nprocs)
+
+def parallelStructuredToVTK(path, npieces, x, y, z, cellData = None, pointData = None, comments = None, compressor = None, nprocs = None):
+    """ Writes data values as a structured grid split in pieces, which are written by
+        a pool of processes. Each piece is stored in a .vts file and a .pvts file lists them.
+
+        PARAMETERS:
+            path: name of the file without extension where data should be saved.
+                  Pieces are stored in files named path_0.vts, path_1.vts, etc.
+            npieces: number of pieces. See partitionExtent.
+            x, y, z, cellData, pointData: see structuredToVTK. Arrays must be numpy arrays.
+            comments, compressor, nprocs: see parallelImageToVTK.
+
+        RETURNS:
+            Full path to saved .pvts file.
+    """
+    assert (x.ndim == 3 and y.ndim == 3 and z.ndim == 3), "Wrong arrays dimensions"
+    s = x.shape
+    end = (s[0] - 1, s[1] - 1, s[2] - 1)
+    return _parallelStructuredToVTK(path, VtkStructuredGrid, VtkPStructuredGrid, end, npieces, None, None, (x, y, z),
+                                    cellData, pointData, comments, compressor, nprocs)
+
+def parallelUnstructuredGridToVTK(path, pieces, comments = None, compressor = None, nprocs = None):
+    """ Writes an unstructured grid split in pieces, which are written by a pool of processes.
+        Each piece is stored in a .vtu file and a .pvtu file lists them.
+
+        PARAMETERS:
+            path: name of the file without extension where data should be saved.
+                  Pieces are stored in files named path_0.vtu, path_1.vtu, etc.
+            pieces: list of dictionaries with the arguments of unstructuredGridToVTK for each piece,
+                    i.e. x, y, z, connectivity, offsets, cell_types and optionally cellData and pointData.
+                    All pieces must have the same data arrays.
+            comments, compressor, nprocs: see parallelImageToVTK.
+
+        RETURNS:
+            Full path to saved .pvtu file.
+    """
+    tasks = [ (_unstructuredPiece, "%s_%d" % (path, i), piece, compressor) for i, piece in enumerate(pieces) ]
+    files = _writePieces(tasks, nprocs)
+
+    first = pieces[0]
+    w = VtkParallelFile(path, VtkPUnstructuredGrid)
+    if comments: w.addComments(comments)
+    w.openGrid()
+    _addDataToFile(w, __convertDictListToArrays(first.get("cellData")), __convertDictListToArrays(first.get("pointData")))
+    w.openElement("PPoints")
+    w.addData("points", (__convertListToArray(first["x"]), __convertListToArray(first["y"]), __convertListToArray(first["z"])))
+    w.closeElement("PPoints")
+    for f in files:
+        w.addPiece(f)
+    w.closeGrid()
+    w.save()
+    return w.getFileName()
+
+# ==============================================================================
+#                             Multiblock files
+# ==============================================================================
+class Block:
+    """ Dataset of a multiblock file, written by one of the functions of this module when
+        the multiblock file is written. A block that does not change, e.g. a static boundary, 
+        can be added to the multiblock files of many steps: it is written once, and the 
+        following files reference the same file.
+    """
+    def __init__(self, writer, *args, **kwargs):
+        """
+            PARAMETERS:
+                writer: function that writes the dataset, e.g. imageToVTK.
+                args, kwargs: arguments of writer, without the path of the file.
+        """
+        self.writer = writer
+        self.args = args
+        self.kwargs = kwargs
+        self.file = None # path to the file, after it is written
+
+    def write(self, path):
+        """ Writes this block to path, unless it was already written. Returns path to its file. """
+        if self.file is None:
+            self.file = self.writer(path, *self.args, **self.kwargs)
+        return self.file
+
+def _collectBlocks(blocks, prefix, leaves):
+    # Lists the leaves of a tree of blocks that must be written, with the path of their file
+    for name, block in blocks.items():
+        if isinstance(block, dict):
+            _collectBlocks(block, prefix + name + "_", leaves)
+        elif isinstance(block, Block) and block.file is None:
+            leaves.append( (block, prefix + name) )
+
+def _addBlocks(w, blocks):
+    for name, block in blocks.items():
+        if isinstance(block, dict):
+            w.openBlock(name)
+            _addBlocks(w, block)
+            w.closeBlock()
+        elif isinstance(block, Block):
+            w.addDataSet(block.file, name)
+        else:
+            w.addDataSet(block, name)
+
+def _writeBlocks(path, leaves, nthreads):
+    # Writes blocks to files in directory path, named as given in leaves, a list of (block, name) tuples 
+    if leaves and not os.path.isdir(path): os.makedirs(path)
+    if nthreads > 1 and len(leaves) > 1:
+        with ThreadPoolExecutor(min(nthreads, len(leaves))) as executor:
+            for f in [executor.submit(b.write, os.path.join(path, name)) for b, name in leaves]:
+                f.result() # raises any error found while writing
+    else:
+        for b, name in leaves:
+            b.write(os.path.join(path, name))
+
+def multiBlockToVTK(path, blocks, nthreads = 1):
+    """
+        Writes a multiblock file (.vtm) and the datasets of its blocks, e.g. all the outputs
+        of a simulation step, so a single file is loaded and added to a VtkGroup.
+
+        PARAMETERS:
+            path: name of the file without extension where the multiblock file should be saved.
+                  Datasets are stored in a directory with the same name, in files named as blocks.
+            blocks: dictionary of blocks. Keys are the names of the blocks and values can be:
+                    a Block, which is written if it was not written before;
+                    a string with the path to a VTK file that already exists;
+                    a dictionary of blocks, which is stored as a nested block.
+            nthreads: number of threads used to write datasets in parallel.
+
+        RETURNS:
+            Full path to saved file.
+    """
+    leaves = []
+    _collectBlocks(blocks, "", leaves)
+    _writeBlocks(path, leaves, nthreads)
+
+    w = VtkMultiBlockFile(path)
+    _addBlocks(w, blocks)
+    w.save()
+    return w.getFileName()
+
+# ==============================================================================
+#                             Overlapping AMR files
+# ==============================================================================
+def _levelSpacings(levels, known):
+    # Spacing of each level of an AMR hierarchy. Levels without patches (listed so that 
+    # following levels keep their index) get a spacing between the spacings of their 
+    # neighbours, or refined by 2 after the last level with patches.
+    spacings = [levels[l][0]["spacing"] if l in known else None for l in range(len(levels))]
+    for l in range(len(levels)):
+        if spacings[l] is not None: continue
+        before = [k for k in known if k < l]
+        after = [k for k in known if k > l]
+        if before and after:
+            a, b = before[-1], after[0]
+            t = (l - a) / (b - a)
+            spacings[l] = [sa * (sb / sa) ** t for sa, sb in zip(spacings[a], spacings[b])]
+        elif before:
+            spacings[l] = [sa / 2 ** (l - before[-1]) for sa in spacings[before[-1]]]
+        else:
+            spacings[l] = [sb * 2 ** (after[0] - l) for sb in spacings[after[0]]]
+    return spacings
+
+def amrToVTK(path, levels, origin = None, compressor = None, nthreads = 1):
+    """
+        Writes a hierarchy of refined image patches as an overlapping AMR file (.vthb), so
+        each level is only stored where it exists instead of flattening it to the finest level.
+
+        PARAMETERS:
+            path: name of the file without extension where the AMR file should be saved.
+                  Patches are stored in a directory with the same name, in files named
+                  level_index.vti, e.g. 1_0.vti.
+            levels: list of levels, from the coarsest to the finest one. Each level is a list of 
+                    patches, and each patch is a dictionary with:
+                    origin: position of the corner of the first cell of the patch. 
+                    spacing: spacing of the cells of the patch. It must be the same for all the
+                             patches of a level.
+                    cellData, pointData: see imageToVTK.
+                    Patches must be aligned with the cells of their level, i.e. the distance
+                    between their origin and the origin of the hierarchy must be a multiple of spacing.
+                    A level without patches is written as an empty level, so the index of 
+                    the following levels does not change.
+            origin: origin of the hierarchy. By default, the lowest origin of the patches of the 
+                    first level that has patches.
+            compressor: None (default) to write uncompressed data, True or an integer level to compress
+                        data with zlib, a ZlibCompressor object, or "auto". See VtkFile.
+            nthreads: number of threads used to write patches in parallel.
+
+        RETURNS:
+            Full path to saved file.
+    """
+    assert (levels), "At least one level is required."
+    known = [l for l, patches in enumerate(levels) if patches]
+    assert (known), "At least one level must have patches."
+    if origin is None:
+        origin = [min(p["origin"][i] for p in levels[known[0]]) for i in range(3)]
+    
+    leaves, boxes = [], []
+    for l, patches in enumerate(levels):
+        for i, p in enumerate(patches):
+            cellData, pointData = p.get("cellData"), p.get("pointData")
+            assert (cellData or pointData)
+            if cellData:
+                size = list(cellData.values())[0].shape
+            else:
+                size = [n - 1 for n in list(pointData.values())[0].shape]
+            spacing = p["spacing"]
+            assert (np.allclose(spacing, patches[0]["spacing"], rtol = 1.0e-9, atol = 0.0)), \
+                   "Patches of level %d have different spacings." % l
+            position = [(p["origin"][a] - origin[a]) / spacing[a] for a in range(3)]
+            assert (np.allclose(position, np.round(position), rtol = 0.0, atol = 1.0e-6)), \
+                   "Patch %d of level %d is not aligned with the cells of its level." % (i, l)
+            start = [int(round(x)) for x in position]
+            end = [start[a] + size[a] - 1 for a in range(3)] # last cell
+            boxes.append( (l, start, end) )
+            leaves.append( (Block(imageToVTK, origin = p["origin"], spacing = spacing, cellData = cellData, 
+                                  pointData = pointData, compressor = compressor), "%d_%d" % (l, i)) )
+    _writeBlocks(path, leaves, nthreads)
+
+    w = VtkOverlappingAMRFile(path, origin)
+    datasets = list(zip(boxes, leaves))
+    for l, spacing in enumerate(_levelSpacings(levels, known)):
+        w.openLevel(l, spacing)
+        for (level, start, end), (block, name) in datasets:
+            if level == l: w.addDataSet(block.file, start, end)
+        w.closeLevel()
+    w.save()
+    return w.getFileName()
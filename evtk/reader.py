@@ -0,0 +1,258 @@
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2024 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+######################################################################################
+
+# **************************************
+# *  Reader of the XML files written   *
+# *  by VtkFile, based on mmap.        *
+# **************************************
+
+import mmap
+import re
+import struct
+import zlib
+try:
+    import numpy as np
+except:
+    print("Numpy is not installed. Please install it before running EVTK again.")
+
+# VTK type names, as written in the header, to numpy types
+vtk_to_np = { "Int8"    : "int8",
+              "UInt8"   : "uint8",
+              "Int16"   : "int16",
+              "UInt16"  : "uint16",
+              "Int32"   : "int32",
+              "UInt32"  : "uint32",
+              "Int64"   : "int64",
+              "UInt64"  : "uint64",
+              "Float32" : "float32",
+              "Float64" : "float64" }
+
+_APPENDED = b'<AppendedData encoding="raw">'
+_COMMENT = re.compile(r"<!--.*?-->", re.S)
+_TAG = re.compile(r"<(/?)(\w+)([^>]*?)(/?)>")
+_ATTRIBUTE = re.compile(r'(\w+)="([^"]*)"')
+
+# Sections of a piece whose data is stored in a regular grid given by the extent of the piece
+_GRID_SECTIONS = ("PointData", "CellData", "Points")
+
+class DataArrayInfo:
+    """ Description of a data array read from the header of a file. """
+    def __init__(self, section, name, dtype, ncomp, offset):
+        self.section = section # parent element, e.g. PointData, CellData, Points or Cells
+        self.name = name
+        self.dtype = dtype     # numpy type, with the byte order of the file
+        self.ncomp = ncomp     # number of components
+        self.offset = offset   # offset in bytes from the beginning of the appended data
+
+    def __repr__(self):
+        return "DataArrayInfo(%s/%s, %s, %d, offset = %d)" % (self.section, self.name, self.dtype, self.ncomp, self.offset)
+
+class VtkPiece:
+    """ Piece of a file: its attributes (e.g. Extent or NumberOfPoints) and data arrays. """
+    def __init__(self, attributes):
+        self.attributes = attributes
+        self.sections = {} # section name -> {array name -> DataArrayInfo}
+
+    def extent(self):
+        """ Returns the extent of the piece as a list of 6 integers, or None if it has no extent. """
+        extent = self.attributes.get("Extent")
+        return [int(e) for e in extent.split()] if extent else None
+
+class VtkFileReader:
+    """ Reads the XML files written by VtkFile (.vti, .vtr, .vts, .vtu, .vtp).
+
+        Only the XML header is parsed. The file is memory-mapped and data arrays are 
+        returned as read-only numpy arrays that are views of the appended data, i.e. 
+        data is not copied and it is only read from disk when it is accessed. Arrays of
+        compressed files are decompressed block by block into a new array.
+        
+        The memory map is released when the reader is closed and no returned array is 
+        still alive.
+    """
+    def __init__(self, filepath):
+        """
+            PARAMETERS:
+                filepath: path to a file written by VtkFile (with extension).
+        """
+        self.filepath = filepath
+        with open(filepath, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        end = self._map.find(_APPENDED)
+        assert (end >= 0), "Data is not appended in raw encoding: " + filepath
+        # Appended data starts after the underscore that follows the opening tag
+        start = self._map.find(b"_", end + len(_APPENDED))
+        assert (start >= 0), "Appended data not found: " + filepath
+        self.appendedDataStart = start + 1
+        self._parseHeader(self._map[:end].decode())
+
+    def _parseHeader(self, header):
+        self.ftype = None        # e.g. ImageData or UnstructuredGrid
+        self.attributes = {}     # attributes of the VTKFile element
+        self.grid = {}           # attributes of the grid element, e.g. WholeExtent, Origin, Spacing
+        self.pieces = []
+        parents = []
+        for closing, tag, attributes, empty in _TAG.findall(_COMMENT.sub("", header)):
+            if closing:
+                assert (parents and parents[-1] == tag), "Unexpected closing tag: " + tag
+                parents.pop()
+                continue
+            attributes = dict(_ATTRIBUTE.findall(attributes))
+            if tag == "VTKFile":
+                self.attributes = attributes
+                self.ftype = attributes["type"]
+                self.byteOrder = "<" if attributes.get("byte_order", "LittleEndian") == "LittleEndian" else ">"
+            elif tag == self.ftype:
+                self.grid = attributes
+            elif tag == "Piece":
+                self.pieces.append(VtkPiece(attributes))
+            elif tag == "DataArray":
+                assert (attributes.get("format") == "appended"), "Only appended data arrays can be read."
+                section = parents[-1]
+                array = DataArrayInfo(section, attributes["Name"], self._dtype(attributes["type"]),
+                                      int(attributes.get("NumberOfComponents", 1)), int(attributes["offset"]))
+                self.pieces[-1].sections.setdefault(section, {})[array.name] = array
+            if not empty: parents.append(tag)
+
+        assert (self.ftype), "Not a VTK XML file: " + self.filepath
+        self.compressor = self.attributes.get("compressor")
+        assert (self.compressor in (None, "vtkZLibDataCompressor")), "Unsupported compressor: " + str(self.compressor)
+        headerType = self.attributes.get("header_type", "UInt32")
+        self._headerChar = self.byteOrder + ("Q" if headerType == "UInt64" else "I")
+        self._headerSize = struct.calcsize(self._headerChar)
+
+    def _dtype(self, vtkType):
+        return np.dtype(vtk_to_np[vtkType]).newbyteorder(self.byteOrder)
+
+    def arrays(self, section, piece = 0, reshape = True):
+        """ Returns the data arrays of a section of a piece.
+
+            PARAMETERS:
+                section: name of the section, e.g. PointData, CellData, Points, Coordinates or Cells.
+                piece: index of the piece.
+                reshape: see getArray.
+
+            RETURNS:
+                Dictionary with the name of each array as key and its data as value.
+        """
+        infos = self.pieces[piece].sections.get(section, {})
+        return {name : self.getArray(name, section, piece, reshape) for name in infos}
+
+    def getArray(self, name, section = None, piece = 0, reshape = True):
+        """ Returns a data array.
+
+            PARAMETERS:
+                name: name of the data array.
+                section: name of the section that contains the array. If None, the array 
+                         is searched in all the sections of the piece.
+                piece: index of the piece.
+                reshape: if True, arrays of image, rectilinear and structured grids are reshaped
+                         to the dimensions of the grid of points or cells (as numpy arrays in 
+                         Fortran order, like the arrays given to the writers). Otherwise, 
+                         scalars are returned as 1D arrays. 
+                         Arrays with more than one component have an additional last
+                         dimension for the components, e.g. (npoints, 3) for vectors.
+
+            RETURNS:
+                Numpy array. It is read-only and, if the file is not compressed, it is a view
+                of the memory map of the file.
+        """
+        info = self._find(name, section, piece)
+        if self.compressor:
+            data = self._decompress(info)
+        else:
+            start = self.appendedDataStart + info.offset
+            nbytes, = struct.unpack_from(self._headerChar, self._map, start)
+            data = np.frombuffer(self._map, dtype = info.dtype, count = nbytes // info.dtype.itemsize, 
+                                 offset = start + self._headerSize)
+        shape = self._shape(info, piece) if reshape else None
+        if shape is not None:
+            # Components are stored first, then points (or cells) with x varying fastest
+            data = np.moveaxis(data.reshape([info.ncomp] + shape, order = "F"), 0, -1)
+            if info.ncomp == 1: data = data[..., 0]
+        elif info.ncomp > 1:
+            data = data.reshape(-1, info.ncomp)
+        return data
+
+    def _find(self, name, section, piece):
+        sections = self.pieces[piece].sections
+        for s in ([section] if section else sections):
+            info = sections.get(s, {}).get(name)
+            if info is not None: return info
+        assert False, "Data array not found: " + name
+
+    def _shape(self, info, piece):
+        # Dimensions of the grid of points or cells of structured files
+        extent = self.pieces[piece].extent()
+        if extent is None or info.section not in _GRID_SECTIONS: return None
+        shape = [extent[2 * i + 1] - extent[2 * i] + 1 for i in range(3)]
+        if info.section == "CellData": shape = [max(n - 1, 1) for n in shape]
+        return shape
+
+    def _decompress(self, info):
+        # Header: number of blocks, size of blocks, size of last block (0 if it is full) and 
+        # compressed size of each block.
+        start = self.appendedDataStart + info.offset
+        nblocks, blockSize, lastSize = struct.unpack_from(self.byteOrder + "3" + self._headerChar[1], self._map, start)
+        sizes = struct.unpack_from(self.byteOrder + str(nblocks) + self._headerChar[1], self._map, start + 3 * self._headerSize)
+        nbytes = (nblocks - 1) * blockSize + (lastSize if lastSize else blockSize) if nblocks else 0
+        data = bytearray(nbytes)
+        position = start + (3 + nblocks) * self._headerSize
+        for i, size in enumerate(sizes):
+            block = zlib.decompress(self._map[position : position + size])
+            data[i * blockSize : i * blockSize + len(block)] = block
+            position += size
+        data = np.frombuffer(data, dtype = info.dtype)
+        data.flags.writeable = False
+        return data
+
+    def close(self):
+        """ Closes the memory map of the file. If arrays returned by this reader are still
+            alive, the map is released when they are deleted.
+        """
+        try:
+            self._map.close()
+        except BufferError: # arrays keep a reference to the map
+            pass
+        self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def readVTK(filepath, reshape = True):
+    """ Reads the data arrays of a file written by VtkFile.
+
+        PARAMETERS:
+            filepath: path to the file (with extension).
+            reshape: see VtkFileReader.getArray.
+
+        RETURNS:
+            List with a dictionary for each piece of the file. Each dictionary maps the
+            name of a section (e.g. PointData or CellData) to the arrays that it contains.
+    """
+    with VtkFileReader(filepath) as reader:
+        return [{section : reader.arrays(section, i, reshape) for section in piece.sections}
+                for i, piece in enumerate(reader.pieces)]
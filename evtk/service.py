@@ -0,0 +1,309 @@
+######################################################################################
+# MIT License
+# 
+# Copyright (c) 2010-2024 Paulo A. Herrera
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+######################################################################################
+
+# **************************************
+# *  Writer process that exports data  *
+# *  placed in shared memory.          *
+# **************************************
+
+import multiprocessing
+import threading
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+try:
+    import numpy as np
+except:
+    print("Numpy is not installed. Please install it before running EVTK again.")
+
+class _SharedDescriptor:
+    # Description of an array stored in a shared memory block, sent to the writer process
+    def __init__(self, name, dtype, shape, order):
+        self.name, self.dtype, self.shape, self.order = name, dtype, shape, order
+
+def _attach(name):
+    # Opens a shared memory block created by another process, which is responsible for unlinking it.
+    # Before Python 3.13, the block is registered again in the resource tracker shared with that process.
+    try:
+        return shared_memory.SharedMemory(name, track = False)
+    except TypeError:
+        return shared_memory.SharedMemory(name)
+
+def _resolve(value, blocks):
+    # Replaces descriptors in value with arrays that are views of the shared memory blocks
+    if isinstance(value, _SharedDescriptor):
+        shm = blocks.get(value.name)
+        if shm is None: shm = blocks[value.name] = _attach(value.name)
+        return np.ndarray(value.shape, dtype = np.dtype(value.dtype), buffer = shm.buf, order = value.order)
+    elif isinstance(value, dict):
+        return {k : _resolve(v, blocks) for k, v in value.items()}
+    elif isinstance(value, tuple):
+        return tuple(_resolve(v, blocks) for v in value)
+    elif isinstance(value, list):
+        return [_resolve(v, blocks) for v in value]
+    return value
+
+def _serve(requests, replies):
+    # Main loop of the writer process
+    from . import hl
+    blocks = {}
+    while True:
+        message = requests.recv()
+        if message is None: break
+        if message[0] == "forget":
+            for name in message[1]:
+                shm = blocks.pop(name, None)
+                if shm: shm.close()
+            continue
+        rid, function, path, args, kwargs = message[1:]
+        try:
+            writer = getattr(hl, function, None)
+            assert (not function.startswith("_") and callable(writer)), "Unknown function: " + function
+            result = writer(path, *_resolve(args, blocks), **_resolve(kwargs, blocks))
+            args = kwargs = None # releases views of the blocks
+            replies.send( (rid, result, None) )
+        except Exception as e:
+            args = kwargs = None
+            try:
+                replies.send( (rid, None, e) )
+            except Exception: # exception cannot be pickled
+                replies.send( (rid, None, RuntimeError(repr(e))) )
+    for shm in blocks.values(): shm.close()
+
+def _close(shm):
+    try:
+        shm.close()
+    except BufferError: # the caller keeps a view of the block, which is released with it
+        pass
+
+class SharedArray:
+    """ Numpy array stored in a shared memory block of a WriterProcess. Arrays are filled by 
+        the caller and read by the writer process without copies. A SharedArray passed to 
+        WriterProcess.submit must not be modified until the returned future is done.
+    """
+    def __init__(self, shm, shape, dtype, order):
+        self.shm = shm
+        self.array = np.ndarray(shape, dtype = dtype, buffer = shm.buf, order = order)
+        self.order = order
+
+    def _descriptor(self):
+        return _SharedDescriptor(self.shm.name, self.array.dtype.str, self.array.shape, self.order)
+
+class WriterProcess:
+    """ Local process that writes files with the functions of the hl module, so encoding,
+        compression and I/O do not compete with the caller for the GIL. Arrays are placed in
+        shared memory blocks, and only small descriptors are sent to the writer process.
+        
+        Arrays can be created in shared memory with array, which avoids any copy, or they are 
+        copied to a shared block by submit. The number of blocks is bounded: when all of them 
+        are in use, new blocks wait until the writer acknowledges that a block can be reused.
+
+        Example:
+            with WriterProcess(maxBlocks = 8) as w:
+                p = w.array((nx, ny, nz))
+                last = None
+                for step in range(nsteps):
+                    if last: w.wait(last)         # p can be modified again
+                    solve(p.array)
+                    last = w.submit("imageToVTK", "./out_%d" % step, cellData = {"pressure" : p})
+    """
+    def __init__(self, maxBlocks = 16):
+        """
+            PARAMETERS:
+                maxBlocks: maximum number of shared memory blocks.
+        """
+        ctx = multiprocessing.get_context("spawn") # a clean process, without the memory and threads of the caller
+        child_requests, self.requests = ctx.Pipe(duplex = False) # (reader, writer)
+        self.replies, child_replies = ctx.Pipe(duplex = False)
+        self.process = ctx.Process(target = _serve, args = (child_requests, child_replies), daemon = True)
+        self.process.start()
+        child_requests.close()
+        child_replies.close()
+        
+        self.maxBlocks = maxBlocks
+        self.blocks = {}       # name -> SharedMemory, all the blocks created by this object
+        self.free = []         # blocks that can be reused by submit
+        self.futures = {}      # request id -> (Future, blocks released when it is done)
+        self.nextId = 0
+        self.stopped = False   # True when the writer process has stopped
+        self.lock = threading.Condition()
+        self.receiver = threading.Thread(target = self._receive, daemon = True)
+        self.receiver.start()
+
+    def _receive(self):
+        # Resolves the futures of the requests acknowledged by the writer process
+        while True:
+            try:
+                rid, result, error = self.replies.recv()
+            except (EOFError, OSError):
+                break
+            with self.lock:
+                future, released = self.futures.pop(rid)
+                self.free.extend(released)
+                self.lock.notify_all()
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        with self.lock: # writer process stopped
+            self.stopped = True
+            futures, self.futures = self.futures, {}
+            self.lock.notify_all()
+        for future, released in futures.values():
+            future.set_exception(RuntimeError("Writer process stopped."))
+
+    def _allocate(self, nbytes):
+        # Returns a free block with at least nbytes, or a new one. Waits while all blocks are in use.
+        with self.lock:
+            while True:
+                fits = [b for b in self.free if b.size >= nbytes]
+                if fits:
+                    shm = min(fits, key = lambda b: b.size)
+                    self.free.remove(shm)
+                    return shm
+                if len(self.blocks) >= self.maxBlocks and self.free:
+                    self._unlink(self.free.pop(0)) # too small, make room for a larger block
+                if len(self.blocks) < self.maxBlocks:
+                    shm = shared_memory.SharedMemory(create = True, size = max(nbytes, 1))
+                    self.blocks[shm.name] = shm
+                    return shm
+                assert (self.futures), "All shared memory blocks are in use. Increase maxBlocks."
+                self.lock.wait()
+
+    def _unlink(self, shm):
+        del self.blocks[shm.name]
+        self.requests.send( ("forget", [shm.name]) )
+        _close(shm)
+        shm.unlink()
+
+    def array(self, shape, dtype = "float64", order = "F"):
+        """ Creates an array in shared memory. The caller owns it until it is released.
+            It counts towards maxBlocks.
+
+            RETURNS:
+                SharedArray, whose numpy array is its attribute array.
+        """
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        return SharedArray(self._allocate(nbytes), shape, dtype, order)
+
+    def release(self, shared):
+        """ Returns the block of a SharedArray to the pool, so it can be reused by submit. """
+        with self.lock:
+            self.free.append(shared.shm)
+            self.lock.notify_all()
+        shared.array = None
+
+    def _describe(self, value, blocks, copies):
+        # Replaces arrays in value with descriptors. Numpy arrays are copied to shared blocks once.
+        if isinstance(value, SharedArray):
+            return value._descriptor()
+        elif isinstance(value, np.ndarray): # including subclasses, e.g. np.memmap
+            d = copies.get(id(value))
+            if d is None:
+                order = "C" if value.flags.c_contiguous else "F"
+                shm = self._allocate(value.nbytes)
+                blocks.append(shm)
+                copy = np.ndarray(value.shape, dtype = value.dtype, buffer = shm.buf, order = order)
+                np.copyto(copy, value)
+                d = copies[id(value)] = _SharedDescriptor(shm.name, value.dtype.str, value.shape, order)
+            return d
+        elif isinstance(value, dict):
+            return {k : self._describe(v, blocks, copies) for k, v in value.items()}
+        elif isinstance(value, tuple):
+            return tuple(self._describe(v, blocks, copies) for v in value)
+        elif isinstance(value, list):
+            return [self._describe(v, blocks, copies) for v in value]
+        return value
+
+    def submit(self, function, path, *args, **kwargs):
+        """ Writes a file in the writer process.
+
+            PARAMETERS:
+                function: name of a function of the hl module, e.g. "structuredToVTK", or the function.
+                path: name of the file without extension.
+                args, kwargs: arguments of the function. SharedArray arguments are passed without 
+                              copies, and numpy arrays are copied to shared blocks.
+
+            RETURNS:
+                concurrent.futures.Future, whose result is the value returned by the function,
+                usually the full path to the file. When it is done, shared arrays can be reused.
+        """
+        if callable(function): function = function.__name__
+        blocks = []
+        try:
+            copies = {}
+            args = self._describe(args, blocks, copies)
+            kwargs = self._describe(kwargs, blocks, copies)
+        except:
+            with self.lock:
+                self.free.extend(blocks)
+            raise
+        future = Future()
+        with self.lock:
+            if self.stopped:
+                self.free.extend(blocks)
+                raise RuntimeError("Writer process stopped.")
+            rid = self.nextId
+            self.nextId += 1
+            self.futures[rid] = (future, blocks)
+        try:
+            self.requests.send( ("write", rid, function, path, args, kwargs) )
+        except:
+            with self.lock:
+                if self.futures.pop(rid, None): self.free.extend(blocks)
+            raise
+        return future
+
+    def wait(self, future = None):
+        """ Waits until a future, or all the submitted files if it is None, are done. 
+            Raises the error found while writing, if any.
+        """
+        if future is not None:
+            return future.result()
+        with self.lock:
+            futures = [f for f, b in self.futures.values()]
+        for f in futures: f.result()
+
+    def close(self):
+        """ Waits until all files are written, stops the writer process and removes shared blocks. """
+        try:
+            self.wait()
+        finally:
+            try:
+                self.requests.send(None)
+            except OSError: # e.g. BrokenPipeError, the writer process already stopped
+                pass
+            self.process.join()
+            self.requests.close()
+            self.receiver.join()
+            self.replies.close()
+            for shm in self.blocks.values():
+                _close(shm)
+                shm.unlink()
+            self.blocks, self.free = {}, []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
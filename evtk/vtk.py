@@ -27,10 +27,17 @@
 # *  export data to binary VTK file.   *
 # **************************************
 
-from .evtk import writeBlockSize, writeArrayToFile, writeArraysToFile
+from .evtk import writeBlockSize, writeArrayToFile, writeArraysToFile, _isArray
+from .evtk import ArraySource, MemmapSource, NpyFileSource, GeneratorSource
+from .evtk import ZlibCompressor, AutoCompressor, CompressedBlockWriter, _toCompressor
+from .evtk import PositionalWriter, EncodedArray, ArrayCache, DIGEST_NAME
+from concurrent.futures import ThreadPoolExecutor
 from .xml import XmlWriter
+import hashlib
+import inspect
 import sys
 import os
+import re
 
 # ================================
 #            VTK Types
@@ -52,6 +59,17 @@ VtkRectilinearGrid  = VtkFileType("RectilinearGrid", ".vtr")
 VtkStructuredGrid   = VtkFileType("StructuredGrid", ".vts")
 VtkUnstructuredGrid = VtkFileType("UnstructuredGrid", ".vtu")
 
+# Parallel file types, which only describe the pieces stored in files of the serial types
+VtkPImageData        = VtkFileType("PImageData", ".pvti")
+VtkPPolyData         = VtkFileType("PPolyData", ".pvtp")
+VtkPRectilinearGrid  = VtkFileType("PRectilinearGrid", ".pvtr")
+VtkPStructuredGrid   = VtkFileType("PStructuredGrid", ".pvts")
+VtkPUnstructuredGrid = VtkFileType("PUnstructuredGrid", ".pvtu")
+
+# Composite file types, which list datasets stored in other files
+VtkMultiBlock        = VtkFileType("vtkMultiBlockDataSet", ".vtm")
+VtkOverlappingAMR    = VtkFileType("vtkOverlappingAMR", ".vthb")
+
 #    DATA TYPES
 class VtkDataType:
 
@@ -127,6 +145,18 @@ def _array_to_string(a):
     s = "".join([repr(num) + " " for num in a])
     return s
 
+# Number of characters reserved for offsets written after the data (enough for a UInt64)
+_OFFSET_WIDTH = 20
+
+# numpy computes dtype.name every time it is accessed, so names are cached
+_type_names = {}
+
+def _type_name(dtype):
+    name = _type_names.get(dtype)
+    if name is None:
+        name = _type_names[dtype] = dtype.name
+    return name
+
 def _get_byte_order():
     if sys.byteorder == "little":
         return "LittleEndian"
@@ -136,19 +166,74 @@ def _get_byte_order():
 # ================================
 #        VtkGroup class
 # ================================
+_DATASET = re.compile(r"<DataSet\b([^>]*)/>") # complete DataSet entry of a VtkGroup file
+
+def _dataset_attributes(match):
+    # Attributes of a DataSet entry matched by _DATASET
+    attributes = dict(re.findall(r'(\w+)="([^"]*)"', match.group(1)))
+    attributes.setdefault("timestep", "nan")
+    return attributes
+
 class VtkGroup:
     
-    def __init__(self, filepath):
+    def __init__(self, filepath, incremental = False, resume = False):
         """ Creates a VtkGroup file that is stored in filepath.
             
             PARAMETERS:
                 filepath: filename without extension.
+                incremental: if True, the file is kept well-formed after each call to addFile, 
+                             so it can be read while it is written, or after the program is killed.
+                             Closing tags are written after each entry and overwritten by the next one.
+                resume: if True and the file exists, entries already stored in it are indexed in
+                        datasets and new entries are added after them, e.g. when a simulation is
+                        restarted. Files that were not closed properly are also accepted, and 
+                        files that are empty or end before their first entry are started again.
         """
-        self.xml = XmlWriter(filepath + ".pvd")
+        filename = filepath + ".pvd"
+        self.incremental = incremental
+        self.datasets = []  # attributes of the DataSet entries of the file, see addFile
+        self.root = os.path.dirname(filepath)
+        if resume and os.path.exists(filename):
+            self.xml = XmlWriter(filename, addDeclaration = False, mode = "r+b")
+            self._resume()
+        else:
+            self.xml = XmlWriter(filename)
+            self._openCollection()
+        if incremental: self._writeTail()
+
+    def _openCollection(self):
         self.xml.openElement("VTKFile")
         self.xml.addAttributes(type = "Collection", version = "0.1",  byte_order = _get_byte_order())
         self.xml.openElement("Collection")
-        self.root = os.path.dirname(filepath)
+
+    def _writeTail(self):
+        tail = (">" if self.xml.openTag else "") + "\n</Collection>\n</VTKFile>"
+        self.xml.writeTail(tail)
+
+    def _resume(self):
+        # Finds the end of the last complete entry, which can be followed by closing tags or 
+        # by an incomplete entry if the file was not closed, and indexes entries before it.
+        # Files that end before the Collection element (e.g. empty) are started again.
+        text = self.xml.stream.read().decode("ASCII")
+        collection = re.search(r"<Collection\b[^>]*?(/?>|$)", text)
+        if collection is None and re.fullmatch(r'\s*(<\?xml[^>]*\?>\s*)?(<VTKFile\b[^>]*(>\s*<C?o?l?l?e?c?t?i?o?n?)?)?', text):
+            self.xml.stream.seek(0)
+            self.xml.stream.truncate()
+            self.xml.addDeclaration()
+            self._openCollection()
+            return
+        assert (collection and collection.group(1) != "/>"), "Not a VtkGroup file: " + self.xml.stream.name
+        end, openTag = collection.end(), collection.group(1) != ">"
+        for m in _DATASET.finditer(text, end):
+            attributes = _dataset_attributes(m)
+            attributes["timestep"] = float(attributes["timestep"])
+            self.datasets.append(attributes)
+            last, openTag = m.end(), False
+        if self.datasets: end = last
+        self.xml.stream.seek(end)
+        self.xml.stream.truncate()
+        self.xml.current = ["VTKFile", "Collection"]
+        self.xml.openTag = openTag
 
     def save(self):
         """ Closes this VtkGroup. """
@@ -172,26 +257,248 @@ class VtkGroup:
         self.xml.openElement("DataSet")
         self.xml.addAttributes(timestep = sim_time, group = group, part = part, file = filename)
         self.xml.closeElement()
+        self.datasets.append({"timestep" : float(sim_time), "group" : str(group), "part" : str(part), "file" : filename})
+        if self.incremental: self._writeTail()
         
+# ================================
+#        VtkSharedGroup class
+# ================================
+class VtkSharedGroup:
+    """ VtkGroup that several processes can write at the same time, e.g. the ranks of a 
+        decomposed simulation or the members of an ensemble. Each process adds entries to 
+        its own journal file, with a single write per entry and without locks. Journals are
+        merged into the VtkGroup file by save, which must be called by one process after 
+        the other processes have closed their groups.
+    """
+    def __init__(self, filepath, part = None):
+        """ Opens the journal of this process for the VtkGroup file stored in filepath.
+            
+            PARAMETERS:
+                filepath: filename without extension.
+                part: default part of the entries added by this process, e.g. its rank.
+                      It also names its journal. If None, the journal is named by the process id.
+        """
+        self.filepath = filepath
+        self.root = os.path.dirname(filepath)
+        self.part = part
+        self.journals = filepath + ".pvd.journals"
+        os.makedirs(self.journals, exist_ok = True)
+        name = ("part%s" % part) if part is not None else ("pid%d" % os.getpid())
+        self.fd = os.open(os.path.join(self.journals, name + ".journal"), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def addFile(self, filepath, sim_time, group = "", part = None):
+        """ Adds file to the journal of this process. See VtkGroup.addFile.
+            If part is None, the part given to the constructor is used.
+        """
+        if part is None: part = self.part if self.part is not None else "0"
+        filename = os.path.relpath(filepath, start = self.root)
+        entry = '<DataSet timestep="%s" group="%s" part="%s" file="%s"/>\n' % (sim_time, group, part, filename)
+        os.write(self.fd, entry.encode("ASCII"))  # entries are never split or mixed
+
+    def close(self):
+        """ Closes the journal of this process. """
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def save(self, keepJournals = False):
+        """ Closes the journal of this process and writes the VtkGroup file with the entries 
+            of all journals, sorted by time and part.
+
+            PARAMETERS:
+                keepJournals: if False, journals are removed after they are merged.
+        """
+        self.close()
+        entries = []
+        journals = sorted(f for f in os.listdir(self.journals) if f.endswith(".journal"))
+        for journal in journals:
+            with open(os.path.join(self.journals, journal), "rb") as f:
+                text = f.read().decode("ASCII")
+            entries.extend(_dataset_attributes(m) for m in _DATASET.finditer(text)) # skips an incomplete last entry
+
+        def key(e):
+            part = e.get("part", "0")
+            return (float(e["timestep"]), int(part) if part.isdigit() else 0, part)
+        entries.sort(key = key)
+
+        g = VtkGroup(self.filepath)
+        for e in entries:
+            g.addFile(os.path.join(self.root, e["file"]), e["timestep"], e.get("group", ""), e.get("part", "0"))
+        g.save()
+        if not keepJournals:
+            for journal in journals: os.remove(os.path.join(self.journals, journal))
+            try:
+                os.rmdir(self.journals)
+            except OSError: # a process created a new journal
+                pass
 
+# ================================
+#        VtkSeries class
+# ================================
+def _acceptsArrayCache(writer):
+    # True if writer has an arrayCache parameter, as the functions of the hl module that write one file
+    try:
+        return "arrayCache" in inspect.signature(writer).parameters
+    except (TypeError, ValueError):
+        return False
+
+class VtkSeries:
+    """ Time series of VTK files collected in a VtkGroup. A step whose arguments did not 
+        change since the previous step is not written again; its DataSet entry points at 
+        the file of the previous step. Arrays that did not change since the previous file,
+        e.g. the mesh, are encoded once and copied to the following files. See ArrayCache.
+    """
+    def __init__(self, filepath, reuseArrays = True, cachePath = None, hashName = DIGEST_NAME, incremental = False, resume = False):
+        """ Creates a VtkSeries whose VtkGroup file is stored in filepath.
+            
+            PARAMETERS:
+                filepath: filename without extension.
+                reuseArrays: if True, arrays that did not change are copied from their encoding.
+                cachePath: path of a file where encoded arrays are stored, instead of memory.
+                hashName: name of the hash algorithm used to compare arrays, as in hashlib.new.
+                incremental, resume: see VtkGroup.
+        """
+        self.group = VtkGroup(filepath, incremental = incremental, resume = resume)
+        self.cacheFile = open(cachePath, "w+b") if cachePath else None
+        self.arrayCache = ArrayCache(self.cacheFile, hashName)
+        self.reuseArrays = reuseArrays
+        self.lastDigest = None
+        self.lastFile = None
+        self.written = 0  # number of files written
+        self.skipped = 0  # number of steps that point at the file of a previous step
+
+    def addStep(self, sim_time, writer, path, *args, **kwargs):
+        """ Writes a step of this series, unless the arguments are the same as in the previous step.
+
+            PARAMETERS:
+                sim_time: simulated time.
+                writer: function that writes the file and returns its full path, e.g. imageToVTK. 
+                        It is called as writer(path, *args, **kwargs), with an arrayCache 
+                        argument if reuseArrays is True and writer has an arrayCache parameter.
+                        Writers without it (e.g. multiBlockToVTK, amrToVTK and the parallel
+                        writers, whose files are written by other threads or processes) 
+                        write all their arrays.
+                path: name of the file without extension.
+                args, kwargs: arguments of writer. Arrays are compared by their digests, and 
+                              other objects by their repr. Array sources are read to compute
+                              their digest, and again to write them.
+
+            RETURNS:
+                Full path to the file of this step.
+        """
+        self.arrayCache.newFile() # arrays may have been modified in place
+        h = hashlib.new(self.arrayCache.hashName)
+        self._update(h, (writer.__module__, writer.__name__, args, kwargs))
+        digest = h.digest()
+        if self.lastFile is None or digest != self.lastDigest:
+            if self.reuseArrays and _acceptsArrayCache(writer): kwargs = dict(kwargs, arrayCache = self.arrayCache)
+            self.lastFile = writer(path, *args, **kwargs)
+            self.lastDigest = digest
+            self.written += 1
+        else:
+            self.skipped += 1
+        self.group.addFile(self.lastFile, sim_time)
+        return self.lastFile
+
+    def _update(self, h, value):
+        # Adds value to hash h. Containers are traversed, so the digest depends on their contents
+        h.update(type(value).__name__.encode())
+        if _isArray(value):
+            h.update(self.arrayCache.digest(value))
+        elif isinstance(value, dict):
+            h.update(b"%d" % len(value))
+            for k in sorted(value, key = repr):
+                self._update(h, k)
+                self._update(h, value[k])
+        elif isinstance(value, (list, tuple)):
+            h.update(b"%d" % len(value))
+            for v in value: self._update(h, v)
+        else:
+            h.update(repr(value).encode())
+
+    def save(self):
+        """ Closes this VtkSeries. """
+        self.group.save()
+        if self.cacheFile:
+            self.cacheFile.close()
+            self.cacheFile = None
+
+# ================================
+#        VtkLayout class
+# ================================
+class VtkLayout:
+    """ Header of a VTK file that can be reused to write other files with the same
+        structure, e.g. the steps of a time series. The first file written with a 
+        layout records its header. Following files only check that the structure 
+        of the file (grid, array names, types and sizes, etc.) has not changed and 
+        write the recorded header, so only the data arrays are written again.
+    """
+    def __init__(self):
+        self.calls = []          # arguments of the calls that created the header
+        self.header = None       # encoded header, up to the beginning of the appended data
+        self.headerOffsets = []
+        self.offset = 0
+        self.offsetPositions = []
+        self.arrayNames = []
+
+    def isRecorded(self):
+        """ Returns True if a header has been recorded in this layout. """
+        return self.header is not None
+
+def _layout_key(args):
+    # Converts arguments to values that can be compared, e.g. tuples instead of arrays
+    return tuple(a if a is None or isinstance(a, (str, int, float)) else tuple(a) for a in args)
 
 # ================================
 #        VtkFile class         
 # ================================
 class VtkFile:
     
-    def __init__(self, filepath, ftype, largeFile = False):
+    def __init__(self, filepath, ftype, largeFile = False, compressor = None, nthreads = 1, layout = None, arrayCache = None):
         """
             PARAMETERS:
                 filepath: filename without extension.
                 ftype: file type, e.g. VtkImageData, etc.
                 largeFile: If size of the stored data cannot be represented by a UInt32.
+                compressor: None (default) to write uncompressed data. True or an integer
+                            compression level to compress data with zlib, or a ZlibCompressor
+                            to also set the size of the compressed blocks. "auto" or an 
+                            AutoCompressor selects the compression level of each array.
+                nthreads: number of threads that write uncompressed arrays in parallel, each one 
+                          at the position given by its offset. It requires os.pwrite. 
+                          Compressed arrays are always written one after the other.
+                layout: VtkLayout used to record the header of this file, or to reuse the 
+                        header recorded while writing a previous file.
+                arrayCache: ArrayCache used to copy the encoding of arrays that did not change 
+                            since the previous file, instead of encoding them again.
         """
         self.ftype = ftype
         self.filename = filepath + ftype.ext
-        self.xml = XmlWriter(self.filename)
+        self.layout = layout
+        self.replay = layout is not None and layout.isRecorded()
+        self.ncalls = 0
+        self.xml = XmlWriter(self.filename, addDeclaration = not self.replay, buffered = True)
         self.offset = 0  # offset in bytes after beginning of binary section
         self.appendedDataIsOpen = False
+        self.compressor = _toCompressor(compressor)
+        # With compression, offsets are only known after data is appended.
+        # They are written at these positions of the header when the file is saved.
+        self.offsetPositions = []
+        self.offsets = []
+        self.arrayNames = []
+        self.nthreads = nthreads
+        self.executor = None
+        self.headerOffsets = [] # offsets of uncompressed arrays, as written in the header
+        self.writes = []        # arrays being written by the executor
+        self.arrayCache = arrayCache
+        self.nappended = 0      # number of arrays appended, i.e. position of the next one
+        assert (nthreads == 1 or hasattr(os, "pwrite")), "Parallel writes require os.pwrite."
+        if self._replay("VtkFile", ftype.name, self.compressor.name if self.compressor else None):
+            self.headerOffsets = list(layout.headerOffsets)
+            self.offset = layout.offset
+            self.offsetPositions = list(layout.offsetPositions)
+            self.arrayNames = list(layout.arrayNames)
+            return
 #        self.largeFile = largeFile
 
 #       if largeFile == False:
@@ -204,6 +511,23 @@ class VtkFile:
                                                           version = "1.0",
                                                           byte_order = _get_byte_order(),
                                                           header_type = "UInt64")
+        if self.compressor:
+            self.xml.addAttributes(compressor = self.compressor.name)
+
+    def _replay(self, *call):
+        """ Records a call that writes to the header in the layout. If the header was already
+            recorded, checks that the call is the same and returns True, so the call 
+            does not write anything.
+        """
+        if self.layout is None: return False
+        call = _layout_key(call)
+        if self.replay:
+            assert (self.ncalls < len(self.layout.calls) and self.layout.calls[self.ncalls] == call), \
+                   "File does not match its layout: " + str(call)
+        else:
+            self.layout.calls.append(call)
+        self.ncalls += 1
+        return self.replay
 
     def addComments(self, comments):
         """ Insert strings stored in comments list as comments into the xml header section of the file. 
@@ -212,6 +536,7 @@ class VtkFile:
             wrong place within the header. BE AWARE!!!
         """
         assert not self.appendedDataIsOpen
+        if self._replay("addComments", comments): return
         for c in comments:
             self.xml.addComment(c)
         
@@ -244,6 +569,7 @@ class VtkFile:
                 this VtkFile to allow chained calls.
         """
         # TODO: Check what are the requirements for each type of grid.
+        if self._replay("openPiece", start, end, npoints, ncells, nverts, nlines, nstrips, npolys): return self
 
         self.xml.openElement("Piece")
         if (start and end):
@@ -267,6 +593,7 @@ class VtkFile:
         return self
 
     def closePiece(self):
+        if self._replay("closePiece"): return
         self.xml.closeElement("Piece")
 
     def openData(self, nodeType, scalars=None, vectors=None, normals=None, tensors=None, tcoords=None):
@@ -283,6 +610,7 @@ class VtkFile:
             RETURNS:
                 this VtkFile to allow chained calls.
         """
+        if self._replay("openData", nodeType, scalars, vectors, normals, tensors, tcoords): return self
         self.xml.openElement(nodeType + "Data")
         if scalars:
             self.xml.addAttributes(scalars = scalars)
@@ -306,6 +634,7 @@ class VtkFile:
             RETURNS:
                 this VtkFile to allow chained calls.
         """
+        if self._replay("closeData", nodeType): return
         self.xml.closeElement(nodeType + "Data")
 
 
@@ -321,6 +650,7 @@ class VtkFile:
             RETURNS:
                 this VtkFile to allow chained calls.
         """
+        if self._replay("openGrid", start, end, origin, spacing): return self
         gType = self.ftype.name
         self.xml.openElement(gType)
         if (gType == VtkImageData.name):
@@ -343,6 +673,7 @@ class VtkFile:
             RETURNS:
                 this VtkFile to allow chained calls.
         """
+        if self._replay("closeGrid"): return
         self.xml.closeElement(self.ftype.name)
 
     
@@ -362,9 +693,22 @@ class VtkFile:
             NOTE: This is a low level function. Use addData if you want
                   to add a numpy array.
         """
+        if self._replay("addHeader", name, dtype, nelem, ncomp): return self
         dtype = np_to_vtk[dtype]
 
         self.xml.openElement( "DataArray")
+        if self.compressor:
+            self.xml.addAttributes( Name = name,
+                                    NumberOfComponents = ncomp,
+                                    type = dtype.name,
+                                    format = "appended")
+            self.offsetPositions.append(self.xml.tell() + len(' offset="'))
+            self.arrayNames.append(name)
+            self.xml.addAttributes( offset = " " * _OFFSET_WIDTH ) # written by save
+            self.xml.closeElement()
+            return self
+
+        self.headerOffsets.append(self.offset)
         self.xml.addAttributes( Name = name,
                                 NumberOfComponents = ncomp,
                                 type = dtype.name,
@@ -387,14 +731,18 @@ class VtkFile:
                 data: one numpy array or a tuple with 3 numpy arrays. If a tuple, the individual
                       arrays must represent the components of a vector field.
                       All arrays must be one dimensional or three-dimensional.
+                      An ArraySource can be used instead of any of the arrays.
+                      It can also be an EncodedArray.
         """
-        if type(data).__name__ == "tuple": # vector data
+        if isinstance(data, EncodedArray):
+            self.addHeader(name, _type_name(data.dtype), data.size, data.ncomp)
+        elif type(data).__name__ == "tuple": # vector data
             assert (len(data) == 3)
             x = data[0]
-            self.addHeader(name, x.dtype.name, x.size, 3)
-        elif type(data).__name__ == "ndarray":
+            self.addHeader(name, _type_name(x.dtype), x.size, 3)
+        elif _isArray(data):
             if data.ndim == 1 or data.ndim == 3:
-                self.addHeader(name, data.dtype.name, data.size, 1)
+                self.addHeader(name, _type_name(data.dtype), data.size, 1)
             else:
                 assert False, "Bad array shape: " + str(data.shape)
         else:
@@ -409,6 +757,7 @@ class VtkFile:
                 nelem: number of elements.
                 ncomp: number of components, 1 (=scalar) or 3 (=vector).
         """
+        assert not self.compressor, "Use appendData to write compressed data."
         self.openAppendedData()
         dsize = np_to_vtk[dtype].size
         block_size = dsize * ncomp * nelem
@@ -427,6 +776,9 @@ class VtkFile:
                       arrays must represent the components of a vector field.
                       All arrays must be one dimensional or three-dimensional.
                       The order of the arrays must coincide with the numbering scheme of the grid.
+                      An ArraySource can be used instead of any of the arrays, in which case it
+                      is written chunk by chunk. It can also be an EncodedArray, whose bytes are 
+                      copied without encoding the data again.
             
             RETURNS:
                 This VtkFile to allow chained calls
@@ -435,43 +787,99 @@ class VtkFile:
         """
         self.openAppendedData()
 
-        if type(data).__name__ == 'tuple': # 3 numpy arrays
+        if self.arrayCache is not None and not isinstance(data, EncodedArray):
+            data = self.arrayCache.lookup(self.nappended, data, self.compressor)
+        self.nappended += 1
+
+        if isinstance(data, EncodedArray):
+            assert (data.compressed == bool(self.compressor)), "Array was encoded with a different compression."
+            if self.compressor:
+                self.offsets.append(self.xml.stream.tell() - self.appendedDataStart)
+                data.writeTo(self.xml.stream)
+                return self
+            block_size = data.ncomp * data.size * data.dtype.itemsize
+            write = data.writeTo
+
+        elif type(data).__name__ == 'tuple': # 3 numpy arrays
             ncomp = len(data)
             assert (ncomp == 3)
             dsize = data[0].dtype.itemsize
             nelem = data[0].size
             block_size = ncomp * nelem * dsize
-            #if self.largeFile == False:
-            writeBlockSize(self.xml.stream, block_size)
-            #else:
-            #    writeBlockSize64Bit(self.xml.stream, block_size)
             x, y, z = data[0], data[1], data[2]
-            writeArraysToFile(self.xml.stream, x, y, z)
+            write = lambda stream: writeArraysToFile(stream, x, y, z)
             
-        elif type(data).__name__ == 'ndarray' and (data.ndim == 1 or data.ndim == 3): # single numpy array
+        elif _isArray(data) and (data.ndim == 1 or data.ndim == 3): # single numpy array or source
             ncomp = 1 
             dsize = data.dtype.itemsize
             nelem = data.size
             block_size = ncomp * nelem * dsize
-            #if self.largeFile == False:
-            writeBlockSize(self.xml.stream, block_size)
-            #else:
-            #    writeBlockSize64Bit(self.xml.stream, block_size)
-            writeArrayToFile(self.xml.stream, data)
+            write = lambda stream: writeArrayToFile(stream, data)
          
         else:
             assert False
 
+        if self.compressor:
+            level = self.compressor.selectLevel(self.arrayNames[len(self.offsets)], data)
+            self.offsets.append(self.xml.stream.tell() - self.appendedDataStart)
+            stream = CompressedBlockWriter(self.xml.stream, self.compressor, block_size, level)
+            write(stream)
+            stream.close()
+        
+        elif self.executor:
+            # Position of the block is known from the header, so it can be written by any thread
+            i = len(self.writes)
+            assert (i < len(self.headerOffsets)), "More arrays appended than declared in the header."
+            end = self.headerOffsets[i + 1] if i + 1 < len(self.headerOffsets) else self.offset
+            assert (end - self.headerOffsets[i] == block_size + 8), "Array does not match its header."
+            self.writes.append(self.executor.submit(self._writeBlockAt, self.headerOffsets[i], block_size, write))
+        
+        else:
+            #if self.largeFile == False:
+            writeBlockSize(self.xml.stream, block_size)
+            #else:
+            #    writeBlockSize64Bit(self.xml.stream, block_size)
+            write(self.xml.stream)
+        
         return self
 
+    def _writeBlockAt(self, offset, block_size, write):
+        stream = PositionalWriter(self.xml.stream.fileno(), self.appendedDataStart + offset)
+        writeBlockSize(stream, block_size)
+        write(stream)
+
     def openAppendedData(self):
         """ Opens binary section.
 
             It is not necessary to explicitly call this function from an external library.
         """
         if not self.appendedDataIsOpen:
-            self.xml.openElement("AppendedData").addAttributes(encoding = "raw").addText("_")
+            if self.replay:
+                assert (self.ncalls == len(self.layout.calls)), "File does not match its layout."
+                self.xml.addBytes(self.layout.header, ["VTKFile", "AppendedData"])
+            else:
+                self.xml.openElement("AppendedData").addAttributes(encoding = "raw").addText("_")
+                header = self.xml.flush() # header is written with a single call
+                if self.layout is not None: self._recordLayout(header)
             self.appendedDataIsOpen = True
+            self.appendedDataStart = self.xml.stream.tell()
+            if self.nthreads > 1 and not self.compressor:
+                # Arrays are written with os.pwrite in a file that already has its final size
+                self.xml.stream.flush()
+                end = self.appendedDataStart + self.offset
+                if hasattr(os, "posix_fallocate"):
+                    os.posix_fallocate(self.xml.stream.fileno(), 0, end)
+                else:
+                    os.ftruncate(self.xml.stream.fileno(), end)
+                self.executor = ThreadPoolExecutor(max_workers = self.nthreads)
+
+    def _recordLayout(self, header):
+        assert (len(header) == self.xml.stream.tell()), "Header was not written with a single call."
+        self.layout.header = header
+        self.layout.headerOffsets = list(self.headerOffsets)
+        self.layout.offset = self.offset
+        self.layout.offsetPositions = list(self.offsetPositions)
+        self.layout.arrayNames = list(self.arrayNames)
 
     def closeAppendedData(self):
         """ Closes binary section.
@@ -482,15 +890,299 @@ class VtkFile:
 
     def openElement(self, tagName):
         """ Useful to add elements such as: Coordinates, Points, Verts, etc. """
+        if self._replay("openElement", tagName): return
         self.xml.openElement(tagName)
 
     def closeElement(self, tagName):
+        if self._replay("closeElement", tagName): return
         self.xml.closeElement(tagName)
 
     def save(self):
         """ Closes file """
+        if self.executor:
+            for w in self.writes: w.result()  # raises any error found while writing
+            self.executor.shutdown()
+            self.executor = None
+            assert (len(self.writes) == len(self.headerOffsets)), "Some arrays were not appended."
+            self.xml.stream.seek(self.appendedDataStart + self.offset)
         if self.appendedDataIsOpen:
             self.xml.closeElement("AppendedData")
         self.xml.closeElement("VTKFile")
+        if self.compressor:
+            assert (len(self.offsets) == len(self.offsetPositions)), "Some arrays were not appended."
+            self.xml.flush()
+            for pos, offset in zip(self.offsetPositions, self.offsets):
+                self.xml.stream.seek(pos)
+                self.xml.stream.write(("%*d" % (_OFFSET_WIDTH, offset)).encode("ASCII"))
         self.xml.close()
+        if self.arrayCache is not None: self.arrayCache.newFile()
     
+
+# ================================
+#        VtkParallelFile class
+# ================================
+class VtkParallelFile:
+    """ Parallel VTK file, e.g. .pvti, that describes the arrays of a dataset and
+        lists the files where its pieces are stored. Readers can load the pieces in parallel.
+    """
+    def __init__(self, filepath, ftype):
+        """
+            PARAMETERS:
+                filepath: filename without extension.
+                ftype: parallel file type, e.g. VtkPImageData.
+        """
+        self.ftype = ftype
+        self.filename = filepath + ftype.ext
+        self.root = os.path.dirname(os.path.abspath(self.filename))
+        self.xml = XmlWriter(self.filename)
+        self.xml.openElement("VTKFile").addAttributes(type = ftype.name,
+                                                      version = "1.0",
+                                                      byte_order = _get_byte_order(),
+                                                      header_type = "UInt64")
+
+    def getFileName(self):
+        """ Returns absolute path to this file. """
+        return os.path.abspath(self.filename)
+
+    def addComments(self, comments):
+        """ Insert strings stored in comments list as comments into the file. See VtkFile.addComments. """
+        for c in comments:
+            self.xml.addComment(c)
+
+    def openGrid(self, start = None, end = None, origin = None, spacing = None, ghostlevel = 0):
+        """ Open grid section.
+
+            PARAMETERS:
+                start, end: start and end indexes of the whole extent. Required for
+                            structured, rectilinear and image grids.
+                origin, spacing: required for image grids.
+                ghostlevel: number of ghost levels of the pieces.
+
+            RETURNS:
+                this VtkParallelFile to allow chained calls.
+        """
+        gType = self.ftype.name
+        self.xml.openElement(gType)
+        if gType in (VtkPImageData.name, VtkPRectilinearGrid.name, VtkPStructuredGrid.name):
+            assert (start and end)
+            self.xml.addAttributes(WholeExtent = _mix_extents(start, end))
+        self.xml.addAttributes(GhostLevel = ghostlevel)
+        if gType == VtkPImageData.name:
+            assert (origin and spacing)
+            self.xml.addAttributes(Origin = _array_to_string(origin),
+                                   Spacing = _array_to_string(spacing))
+        return self
+
+    def closeGrid(self):
+        self.xml.closeElement(self.ftype.name)
+        return self
+
+    def openData(self, nodeType, scalars = None, vectors = None):
+        """ Open data section, PPointData or PCellData. See VtkFile.openData. """
+        self.xml.openElement("P" + nodeType + "Data")
+        if scalars:
+            self.xml.addAttributes(scalars = scalars)
+        if vectors:
+            self.xml.addAttributes(vectors = vectors)
+        return self
+
+    def closeData(self, nodeType):
+        self.xml.closeElement("P" + nodeType + "Data")
+        return self
+
+    def openElement(self, tagName):
+        """ Useful to add elements such as: PCoordinates, PPoints, etc. """
+        self.xml.openElement(tagName)
+        return self
+
+    def closeElement(self, tagName):
+        self.xml.closeElement(tagName)
+        return self
+
+    def addHeader(self, name, dtype, ncomp):
+        """ Adds description of an array stored in the pieces.
+
+            PARAMETERS:
+                name: data array name.
+                dtype: string describing type of the data, e.g. 'float64'.
+                ncomp: number of components, 1 (=scalar) and 3 (=vector).
+        """
+        dtype = np_to_vtk[dtype]
+        self.xml.openElement("PDataArray")
+        self.xml.addAttributes(type = dtype.name, Name = name, NumberOfComponents = ncomp)
+        self.xml.closeElement()
+        return self
+
+    def addData(self, name, data):
+        """ Adds description of an array, taken from one numpy array, array source or a
+            tuple with 3 arrays, e.g. the data of any piece. See VtkFile.addData.
+        """
+        if type(data).__name__ == "tuple":
+            assert (len(data) == 3)
+            return self.addHeader(name, _type_name(data[0].dtype), 3)
+        return self.addHeader(name, _type_name(data.dtype), 1)
+
+    def addPiece(self, source, start = None, end = None):
+        """ Adds a piece.
+
+            PARAMETERS:
+                source: path to the file with the piece.
+                start, end: start and end indexes of the piece, for structured grids.
+
+            RETURNS:
+                this VtkParallelFile to allow chained calls.
+        """
+        self.xml.openElement("Piece")
+        if start and end:
+            self.xml.addAttributes(Extent = _mix_extents(start, end))
+        self.xml.addAttributes(Source = os.path.relpath(os.path.abspath(source), start = self.root))
+        self.xml.closeElement()
+        return self
+
+    def save(self):
+        """ Closes file """
+        self.xml.closeElement("VTKFile")
+        self.xml.close()
+
+# ================================
+#        VtkMultiBlockFile class
+# ================================
+class VtkMultiBlockFile:
+    """ Multiblock VTK file (.vtm), a tree of blocks whose leaves are datasets stored
+        in other files, e.g. the fluid grid, particles and boundaries of a simulation.
+    """
+    def __init__(self, filepath):
+        """
+            PARAMETERS:
+                filepath: filename without extension.
+        """
+        self.filename = filepath + VtkMultiBlock.ext
+        self.root = os.path.dirname(os.path.abspath(self.filename))
+        self.xml = XmlWriter(self.filename)
+        self.xml.openElement("VTKFile").addAttributes(type = VtkMultiBlock.name,
+                                                      version = "1.0",
+                                                      byte_order = _get_byte_order(),
+                                                      header_type = "UInt64")
+        self.xml.openElement(VtkMultiBlock.name)
+        self.indexes = [0] # index of the next block at each level
+
+    def getFileName(self):
+        """ Returns absolute path to this file. """
+        return os.path.abspath(self.filename)
+
+    def _openIndexed(self, tag, name):
+        self.xml.openElement(tag).addAttributes(index = self.indexes[-1])
+        if name is not None: self.xml.addAttributes(name = name)
+        self.indexes[-1] += 1
+
+    def openBlock(self, name = None):
+        """ Opens a block, which contains the blocks and datasets added until it is closed.
+
+            RETURNS:
+                this VtkMultiBlockFile to allow chained calls.
+        """
+        self._openIndexed("Block", name)
+        self.indexes.append(0)
+        return self
+
+    def closeBlock(self):
+        self.indexes.pop()
+        self.xml.closeElement("Block")
+        return self
+
+    def addDataSet(self, filepath, name = None):
+        """ Adds a dataset stored in a VTK file.
+
+            PARAMETERS:
+                filepath: path to the file. It is stored relative to this file.
+                name: name of the dataset.
+
+            RETURNS:
+                this VtkMultiBlockFile to allow chained calls.
+        """
+        self._openIndexed("DataSet", name)
+        self.xml.addAttributes(file = os.path.relpath(os.path.abspath(filepath), start = self.root))
+        self.xml.closeElement()
+        return self
+
+    def save(self):
+        """ Closes file """
+        assert (len(self.indexes) == 1), "Some blocks were not closed."
+        self.xml.closeElement(VtkMultiBlock.name)
+        self.xml.closeElement("VTKFile")
+        self.xml.close()
+
+# ================================
+#   VtkOverlappingAMRFile class
+# ================================
+class VtkOverlappingAMRFile:
+    """ Overlapping AMR file (.vthb), a hierarchy of levels of image patches. Patches are
+        stored in .vti files, and their position is given by their box of cells in the
+        index space of their level.
+    """
+    def __init__(self, filepath, origin):
+        """
+            PARAMETERS:
+                filepath: filename without extension.
+                origin: 3D array or list with the origin of the hierarchy, i.e. the position of
+                        the corner of the cell with indexes (0,0,0) in all levels.
+        """
+        self.filename = filepath + VtkOverlappingAMR.ext
+        self.root = os.path.dirname(os.path.abspath(self.filename))
+        self.xml = XmlWriter(self.filename)
+        self.xml.openElement("VTKFile").addAttributes(type = VtkOverlappingAMR.name,
+                                                      version = "1.1",
+                                                      byte_order = _get_byte_order(),
+                                                      header_type = "UInt64")
+        self.xml.openElement(VtkOverlappingAMR.name).addAttributes(origin = _array_to_string(origin), 
+                                                                   grid_description = "XYZ")
+        self.index = None # index of the next dataset of the open level
+
+    def getFileName(self):
+        """ Returns absolute path to this file. """
+        return os.path.abspath(self.filename)
+
+    def openLevel(self, level, spacing):
+        """ Opens a level of the hierarchy.
+
+            PARAMETERS:
+                level: index of the level, starting with 0 for the coarsest one.
+                spacing: 3D array or list with the spacing of the cells of the level.
+
+            RETURNS:
+                this VtkOverlappingAMRFile to allow chained calls.
+        """
+        assert (self.index is None), "Previous level was not closed."
+        self.xml.openElement("Block").addAttributes(level = level, spacing = _array_to_string(spacing))
+        self.index = 0
+        return self
+
+    def closeLevel(self):
+        self.xml.closeElement("Block")
+        self.index = None
+        return self
+
+    def addDataSet(self, filepath, start, end):
+        """ Adds a patch of the open level.
+
+            PARAMETERS:
+                filepath: path to the .vti file of the patch. It is stored relative to this file.
+                start, end: indexes of the first and last cells of the patch in the level.
+
+            RETURNS:
+                this VtkOverlappingAMRFile to allow chained calls.
+        """
+        assert (self.index is not None), "No level is open."
+        self.xml.openElement("DataSet").addAttributes(index = self.index, 
+                                                      amr_box = _mix_extents(start, end),
+                                                      file = os.path.relpath(os.path.abspath(filepath), start = self.root))
+        self.xml.closeElement()
+        self.index += 1
+        return self
+
+    def save(self):
+        """ Closes file """
+        assert (self.index is None), "Last level was not closed."
+        self.xml.closeElement(VtkOverlappingAMR.name)
+        self.xml.closeElement("VTKFile")
+        self.xml.close()
@@ -29,36 +29,97 @@
 
 _DEFAUL_ENCODING = "ASCII"
 
+# Format strings of the attributes of each set of names, e.g. those of DataArray elements,
+# which are computed once and reused by all the elements with the same attribute names.
+_attribute_formats = {}
+
 class XmlWriter:
-    def __init__(self, filepath, addDeclaration = True):
-        self.stream = open(filepath, "wb")
+    def __init__(self, filepath, addDeclaration = True, mode = "wb", buffered = False):
+        """ Creates a XML file. 
+            Use mode "r+b" to continue writing an existing file, see VtkGroup.
+            If buffered is True, text is kept in memory until flush or close are called, 
+            so it is written to the file with a single call (see VtkFile). Otherwise,
+            text is written to the stream as it is added.
+        """
+        self.stream = open(filepath, mode)
         self.openTag = False
         self.current = []
+        self.buffered = buffered
+        self.pending = []     # text that has not been written to stream yet
+        self.pendingSize = 0
         if (addDeclaration): self.addDeclaration()
 
+    def _write(self, sstr):
+        if not self.buffered:
+            self.stream.write(sstr.encode(_DEFAUL_ENCODING))
+            return
+        self.pending.append(sstr)
+        self.pendingSize += len(sstr)
+
+    def flush(self):
+        """ Writes text added since the last call to the stream. 
+            It must be called before writing directly to the stream, e.g. binary data.
+
+            RETURNS:
+                bytes that were written, empty if the writer is not buffered.
+        """
+        data = "".join(self.pending).encode(_DEFAUL_ENCODING)
+        if data:
+            self.stream.write(data)
+            self.pending = []
+            self.pendingSize = 0
+        return data
+
+    def addBytes(self, data, current):
+        """ Writes text that was already encoded, e.g. a header cached from another file.
+            
+            PARAMETERS:
+                data: encoded text.
+                current: list of elements that are open at the end of data, e.g. ["VTKFile"].
+        """
+        assert (not self.openTag)
+        self.flush()
+        self.stream.write(data)
+        self.current = list(current)
+
+    def writeTail(self, tail):
+        """ Writes pending text followed by tail with a single call, and moves back to the 
+            beginning of tail, so text added later overwrites it. Used to keep a file 
+            well-formed while it is written, e.g. with closing tags written after each element.
+        """
+        pos = self.tell()
+        self._write(tail)
+        self.flush()
+        self.stream.flush()
+        self.stream.seek(pos)
+
+    def tell(self):
+        """ Returns current position in the file, including text that has not been written yet. """
+        return self.stream.tell() + self.pendingSize  # ASCII: one byte per character
+
     def addComment(self, sstr):
         """ Adds (open and close) a single comment contained in string sstr. 
             TODO: Add a smart check for the position of the comments in the file. For now,
                   we rely on the caller.
         """
         if self.openTag: 
-            self.stream.write(b">")
+            self._write(">")
             self.openTag = False
-        self.stream.write(b'\n<!-- ') # new line is not strictly necessary
-        self.stream.write(sstr.encode(_DEFAUL_ENCODING))
-        self.stream.write(b' -->')    # new line here is not necessary?
+        self._write('\n<!-- ') # new line is not strictly necessary
+        self._write(sstr)
+        self._write(' -->')    # new line here is not necessary?
         
     def close(self):
         assert(not self.openTag)
+        self.flush()
         self.stream.close()
 
     def addDeclaration(self):
-        self.stream.write(b'<?xml version="1.0"?>')
+        self._write('<?xml version="1.0"?>')
     
     def openElement(self, tag):
-        if self.openTag: self.stream.write(b">")
-        st = "\n<%s" % tag
-        self.stream.write(st.encode(_DEFAUL_ENCODING))
+        if self.openTag: self._write(">")
+        self._write("\n<%s" % tag)
         self.openTag = True
         self.current.append(tag)
         return self
@@ -67,27 +128,28 @@ class XmlWriter:
         if tag:
             assert(self.current.pop() == tag)
             if (self.openTag):
-                self.stream.write(b">")
+                self._write(">")
                 self.openTag = False
-            st = "\n</%s>" % tag
-            self.stream.write(st.encode(_DEFAUL_ENCODING))
+            self._write("\n</%s>" % tag)
         else:
-            self.stream.write(b"/>")
+            self._write("/>")
             self.openTag = False
             self.current.pop()
         return self
 
     def addText(self, text):
         if (self.openTag):
-            self.stream.write(b">\n")
+            self._write(">\n")
             self.openTag = False
-        self.stream.write(text.encode(_DEFAUL_ENCODING))
+        self._write(text)
         return self
 
     def addAttributes(self, **kwargs):
         assert (self.openTag)
-        for key in kwargs:
-            st = ' %s="%s"'%(key, kwargs[key])
-            self.stream.write(st.encode(_DEFAUL_ENCODING))
+        keys = tuple(kwargs)
+        fmt = _attribute_formats.get(keys)
+        if fmt is None:
+            fmt = _attribute_formats[keys] = "".join([' %s="%%s"' % key for key in keys])
+        self._write(fmt % tuple(kwargs.values()))
         return self
 
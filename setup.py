@@ -23,7 +23,7 @@
 ######################################################################################
 
 import setuptools                          # needed to create wheel file
-from distutils.core import setup
+from setuptools import setup                # distutils ignores entry_points
 from evtk.version import PYEVTK_VERSION
 
 def readme(fname):
@@ -42,6 +42,9 @@ setup(
     packages = ['evtk'],
     package_dir = {'evtk' : 'evtk'},
     package_data = {'evtk' :  ['LICENSE', 'examples/*.py']},
+    entry_points = {
+        "console_scripts": ["evtk-convert = evtk.cli:main"],
+    },
     project_urls={
         "Bug Tracker": "https://github.com/paulo-herrera/PyEVTK",
         "Documentation": "https://github.com/paulo-herrera/PyEVTK",